@@ -0,0 +1,234 @@
+"""Budget-threshold and anomaly alerts, computed off the request path
+
+Expense writes only enqueue an ``ExpenseEvent`` row. ``process_events`` drains
+the queue in batches, coalesces events per user and category, recomputes just
+the affected month-to-date totals and writes ``Notification`` rows;
+``deliver_notifications`` then emails them, one message per user.
+"""
+import logging
+import smtplib
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from api import metrics
+from api.currency import convert, converted_amount, format_money
+from api.models import Budget, Expense, ExpenseEvent, Notification
+from api.versioning import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(expense, deleted=False):
+    """Record an expense write for the worker; one INSERT on the write path"""
+    ExpenseEvent.objects.create(
+        user_id=expense.user_id,
+        expense_id=expense.pk,
+        category=expense.category,
+        amount=expense.amount,
+        currency=expense.currency,
+        date=expense.date,
+        deleted=deleted,
+    )
+
+
+def _budget_alerts(pairs, month_start):
+    """Notifications for budgets whose month-to-date spend crossed a threshold"""
+    user_ids = {user_id for user_id, _ in pairs}
+    categories = {category for _, category in pairs}
+    spent = {
+        (row["user_id"], row["category"]): row["total"]
+        for row in Expense.objects.filter(
+            user_id__in=user_ids, category__in=categories, date__gte=month_start
+        )
+        .order_by()
+        .values("user_id", "category")
+        .annotate(total=Sum(converted_amount()))
+    }
+    month = month_start.strftime("%Y-%m")
+    sent = set(
+        Notification.objects.filter(
+            user_id__in=user_ids, dedupe_key__startswith="budget:", dedupe_key__contains=f":{month}:"
+        ).values_list("user_id", "dedupe_key")
+    )
+
+    thresholds = sorted(settings.ALERTS["BUDGET_THRESHOLDS"], reverse=True)
+    alerts = []
+    budgets = Budget.objects.filter(user_id__in=user_ids, category__name__in=categories).select_related("category")
+    for budget in budgets:
+        name = budget.category.name
+        if (budget.user_id, name) not in pairs or budget.limit <= 0:
+            continue
+        total = spent.get((budget.user_id, name), 0)
+        ratio = total / budget.limit
+        for threshold in thresholds:
+            key = f"budget:{budget.category_id}:{month}:{round(threshold * 100)}"
+            if (budget.user_id, key) in sent:
+                # This or a higher threshold was already reported this month
+                break
+            if ratio < threshold:
+                continue
+            exceeded = threshold >= 1
+            alerts.append(
+                Notification(
+                    user_id=budget.user_id,
+                    kind="budget_exceeded" if exceeded else "budget_threshold",
+                    category=name,
+                    dedupe_key=key,
+                    message=(
+                        f"You've gone over your {name} budget this month: "
+                        f"{format_money(total)} of {format_money(budget.limit)} ({ratio:.0%})."
+                        if exceeded
+                        else f"You've used {ratio:.0%} of your {name} budget this month "
+                        f"({format_money(total)} of {format_money(budget.limit)})."
+                    ),
+                )
+            )
+            break
+    return alerts
+
+
+def _anomaly_alerts(events):
+    """Notifications for expenses far above the user's usual spend in that category"""
+    z_threshold = settings.ALERTS["ANOMALY_Z_SCORE"]
+    min_history = settings.ALERTS["ANOMALY_MIN_HISTORY"]
+    stats = {
+        (row["user_id"], row["category"]): row
+        for row in Expense.objects.filter(
+            user_id__in={event.user_id for event in events},
+            category__in={event.category for event in events},
+        )
+        .order_by()
+        .values("user_id", "category")
+        .annotate(
+            n=Count("id"),
+            total=Sum(converted_amount()),
+            squares=Sum(converted_amount() * converted_amount()),
+        )
+    }
+
+    alerts = []
+    for event in events:
+        row = stats.get((event.user_id, event.category))
+        if row is None:
+            continue
+        # Leave the expense itself out of its own baseline
+        amount = float(convert(event.amount, event.currency))
+        n = row["n"] - 1
+        if n < min_history:
+            continue
+        mean = (float(row["total"]) - amount) / n
+        variance = max((float(row["squares"]) - amount**2) / n - mean**2, 0)
+        # Floor the spread so a perfectly flat history doesn't flag every cent
+        std = max(variance**0.5, 0.1 * abs(mean))
+        if not std:
+            continue
+        z_score = (amount - mean) / std
+        if z_score < z_threshold:
+            continue
+        alerts.append(
+            Notification(
+                user_id=event.user_id,
+                kind="anomaly",
+                category=event.category,
+                dedupe_key=f"anomaly:{event.expense_id}",
+                message=(
+                    f"Unusual {event.category} expense on {event.date:%d %b}: {format_money(amount)}, "
+                    f"about {amount / mean:.1f}x your typical {format_money(mean)}."
+                    if mean > 0
+                    else f"Unusual {event.category} expense on {event.date:%d %b}: {format_money(amount)}."
+                ),
+            )
+        )
+    return alerts
+
+
+def process_events(batch_size=None):
+    """Drain one batch of expense events; returns ``(events, notifications)``"""
+    batch_size = batch_size or settings.ALERTS["BATCH_SIZE"]
+    month_start = timezone.now().date().replace(day=1)
+
+    with transaction.atomic():
+        queue = ExpenseEvent.objects.order_by("id")
+        if connection.features.has_select_for_update_skip_locked:
+            # Several workers can drain the queue side by side
+            queue = queue.select_for_update(skip_locked=True)
+        events = list(queue[:batch_size])
+        if not events:
+            return 0, 0
+
+        # Latest event per expense wins, so edits and deletes coalesce
+        latest = {}
+        for event in events:
+            latest[event.expense_id or -event.pk] = event
+        live = [event for event in latest.values() if not event.deleted]
+
+        # Deletes and moves only lower a category's spend, so they can't cross a threshold
+        budget_pairs = {(event.user_id, event.category) for event in live if event.date >= month_start}
+        alerts = _budget_alerts(budget_pairs, month_start) if budget_pairs else []
+        alerts += _anomaly_alerts(live) if live else []
+
+        Notification.objects.bulk_create(alerts, ignore_conflicts=True)
+        ExpenseEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+        for user_id in {alert.user_id for alert in alerts}:
+            bump_data_version(user_id)
+
+    for alert in alerts:
+        metrics.inc("api_alerts_total", kind=alert.kind)
+    return len(events), len(alerts)
+
+
+def deliver_notifications(limit=None):
+    """Email pending notifications, batched into one message per user"""
+    limit = limit or settings.ALERTS["BATCH_SIZE"]
+    pending = list(
+        Notification.objects.filter(emailed_at__isnull=True)
+        .select_related("user")
+        .order_by("user_id", "created_at")[:limit]
+    )
+    by_user = defaultdict(list)
+    for notification in pending:
+        by_user[notification.user].append(notification)
+
+    # Users without an address are marked too, otherwise they'd be retried forever
+    done = []
+    messages = []
+    for user, notifications in by_user.items():
+        if not user.email:
+            done.extend(notifications)
+            continue
+        body = "\n".join(f"• {notification.message}" for notification in notifications)
+        message = EmailMessage(
+            subject=f"Expense Tracker: {len(notifications)} new alert{'s' if len(notifications) > 1 else ''}",
+            body=f"Hi {user.username},\n\n{body}\n",
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[user.email],
+        )
+        messages.append((notifications, message))
+
+    sent = 0
+    if messages:
+        try:
+            # One SMTP session for the whole batch
+            with get_connection(fail_silently=False) as mail:
+                for notifications, message in messages:
+                    try:
+                        mail.send_messages([message])
+                    except smtplib.SMTPRecipientsRefused:
+                        # Would fail the same way on every retry
+                        logger.warning("Alert email to user %s was refused", notifications[0].user_id)
+                    else:
+                        sent += 1
+                    done.extend(notifications)
+        except (smtplib.SMTPException, OSError):
+            # Whatever was not sent stays pending for the next run
+            logger.exception("Sending alert emails failed after %d of %d", sent, len(messages))
+
+    Notification.objects.filter(pk__in=[notification.pk for notification in done]).update(
+        emailed_at=timezone.now()
+    )
+    return sent
@@ -0,0 +1,245 @@
+"""Vectorized expense analytics over a per-user in-memory column store
+
+Each active user's expenses are held as compact NumPy columns (day ordinal,
+amount in hundredths of the display currency, category code), loaded with one query
+per data version and FX table and evicted least-recently-used once the cache
+exceeds its byte budget.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+
+from api import currency, metrics
+from api.models import Expense
+from api.series import densify, key_to_date, month_key
+from api.versioning import get_data_version
+
+PERCENTILES = (25, 50, 75, 90, 95)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class ExpenseColumns:
+    """One user's expenses as parallel NumPy arrays"""
+
+    def __init__(self, version, categories, days, amounts, codes):
+        self.version = version  # (data version, FX table version)
+        self.categories = categories  # code -> category name
+        self.days = days  # int32 date.toordinal()
+        self.amounts = amounts  # int64 hundredths of the display currency
+        self.codes = codes  # int16 index into categories
+        self.category_codes = {name: code for code, name in enumerate(categories)}
+        self.nbytes = (
+            days.nbytes + amounts.nbytes + codes.nbytes + sum(len(name) + 50 for name in categories)
+        )
+
+    @classmethod
+    def load(cls, user, version):
+        rows = list(
+            Expense.objects.filter(user=user)
+            .order_by()
+            .values_list("date", "amount", "category", "currency")
+        )
+        if not rows:
+            return cls(version, [], np.empty(0, np.int32), np.empty(0, np.int64), np.empty(0, np.int16))
+
+        dates, amounts, categories, currencies = zip(*rows)
+        names, codes = np.unique(np.array(categories, dtype=object), return_inverse=True)
+        # Convert into the display currency once, at load time
+        currency_codes, currency_index = np.unique(np.array(currencies, dtype=object), return_inverse=True)
+        factors = currency.factors(currency_codes)[currency_index]
+        return cls(
+            version,
+            [str(name) for name in names],
+            np.fromiter((d.toordinal() for d in dates), np.int32, len(dates)),
+            np.rint(np.array(amounts, dtype=np.float64) * factors * 100).astype(np.int64),
+            codes.astype(np.int16),
+        )
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @property
+    def display_amounts(self):
+        return self.amounts / 100
+
+    @property
+    def month_keys(self):
+        """``year * 12 + month - 1`` for every row"""
+        months = (self.days - EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]")
+        return months.astype(np.int64) + 1970 * 12
+
+    def mask(self, category=None, start=None, end=None):
+        """Boolean row filter: category name, ``start <= date < end``"""
+        selected = np.ones(len(self), dtype=bool)
+        if category is not None:
+            code = self.category_codes.get(category)
+            if code is None:
+                return np.zeros(len(self), dtype=bool)
+            selected &= self.codes == code
+        if start is not None:
+            selected &= self.days >= start.toordinal()
+        if end is not None:
+            selected &= self.days < end.toordinal()
+        return selected
+
+    def total(self, category=None, start=None, end=None):
+        """Sum of the matching expenses as a Decimal"""
+        cents = int(self.amounts[self.mask(category, start, end)].sum())
+        return Decimal(cents) / 100
+
+    def monthly_series(self, start=None, end=None):
+        """Zero-filled monthly totals per category for ``start <= date <= end``"""
+        keys = self.month_keys
+        first = month_key(start) if start is not None else int(keys.min())
+        last = month_key(end) if end is not None else int(keys.max())
+        return densify(self.categories, self.codes, keys, self.display_amounts, first, last)
+
+    def category_totals(self, start=None, end=None):
+        """``{category: Decimal total}`` for every category with spending"""
+        selected = self.mask(start=start, end=end)
+        codes = self.codes[selected]
+        size = len(self.categories)
+        counts = np.bincount(codes, minlength=size)
+        totals = np.bincount(codes, weights=self.amounts[selected], minlength=size)
+        return {
+            name: Decimal(int(round(totals[code]))) / 100
+            for code, name in enumerate(self.categories)
+            if counts[code]
+        }
+
+
+class ColumnCache:
+    """Thread-safe LRU of ``ExpenseColumns`` bounded by total bytes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.nbytes = 0
+
+    @property
+    def max_bytes(self):
+        return getattr(settings, "ANALYTICS_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+    def get(self, user):
+        version = (get_data_version(user), currency.rate_table().version)
+        with self._lock:
+            columns = self._entries.get(user.pk)
+            if columns is not None and columns.version == version:
+                self._entries.move_to_end(user.pk)
+                metrics.inc("api_cache_requests_total", cache="analytics", result="hit")
+                return columns
+
+        metrics.inc("api_cache_requests_total", cache="analytics", result="miss")
+        columns = ExpenseColumns.load(user, version)
+        with self._lock:
+            previous = self._entries.pop(user.pk, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            self._entries[user.pk] = columns
+            self.nbytes += columns.nbytes
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return columns
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+
+column_cache = ColumnCache()
+
+
+def get_columns(user):
+    """The user's expense columns for their current data version"""
+    return column_cache.get(user)
+
+
+def grouped_stats(group_codes, amounts, n_groups):
+    """Count, total, mean, std, min/max and percentiles for every group at once
+
+    ``amounts`` must not be empty; groups without rows get zeros.
+    """
+    counts = np.bincount(group_codes, minlength=n_groups)
+    totals = np.bincount(group_codes, weights=amounts, minlength=n_groups)
+    safe_counts = np.maximum(counts, 1)
+    means = totals / safe_counts
+    squares = np.bincount(group_codes, weights=amounts**2, minlength=n_groups)
+    stds = np.sqrt(np.maximum(squares / safe_counts - means**2, 0))
+
+    # Sort by (group, amount) so each group is a contiguous ascending run
+    order = np.lexsort((amounts, group_codes))
+    ordered = amounts[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    last = np.maximum(counts - 1, 0)
+    end = len(ordered) - 1
+
+    def at(offsets):
+        return np.where(counts > 0, ordered[(starts + offsets).clip(max=end)], 0)
+
+    stats = {
+        "count": counts,
+        "total": totals,
+        "mean": means,
+        "std": stds,
+        "min": at(0),
+        "max": at(last),
+    }
+    for q in PERCENTILES:
+        # Linear interpolation, same as np.percentile's default
+        position = last * q / 100
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        stats[f"p{q}"] = at(low) + (at(high) - at(low)) * (position - low)
+    return stats
+
+
+def _rows(stats, labels, label_key):
+    rows = []
+    for idx, label in enumerate(labels):
+        if not stats["count"][idx]:
+            continue
+        row = {label_key: label}
+        for key, values in stats.items():
+            row[key] = int(values[idx]) if key == "count" else round(float(values[idx]), 2)
+        rows.append(row)
+    return rows
+
+
+def expense_stats(user):
+    """Overall, per-category and per-month statistics from the column store"""
+    columns = get_columns(user)
+    names, codes, month_keys, amounts = (
+        columns.categories,
+        columns.codes,
+        columns.month_keys,
+        columns.display_amounts,
+    )
+    if not len(amounts):
+        return {"overall": None, "by_category": [], "by_month": [], "currency": currency.display_currency()}
+
+    overall = _rows(grouped_stats(np.zeros(len(amounts), np.int64), amounts, 1), ["all"], "scope")[0]
+    by_category = _rows(grouped_stats(codes.astype(np.int64), amounts, len(names)), names, "category")
+
+    first_month = int(month_keys.min())
+    month_codes = (month_keys - first_month).astype(np.int64)
+    n_months = int(month_codes.max()) + 1
+    month_labels = [key_to_date(first_month + i).strftime("%Y-%m") for i in range(n_months)]
+    by_month = _rows(grouped_stats(month_codes, amounts, n_months), month_labels, "month")
+
+    return {
+        "overall": overall,
+        "by_category": by_category,
+        "by_month": by_month,
+        "currency": currency.display_currency(),
+    }
+
+
+def find_mentioned_category(query, category_names):
+    """Return the first category whose name appears in the query"""
+    return next((name for name in category_names if name.lower() in query), None)
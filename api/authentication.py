@@ -0,0 +1,17 @@
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from api import metrics
+
+
+class InstrumentedTokenAuthentication(TokenAuthentication):
+    """Token authentication that counts successful and failed lookups"""
+
+    def authenticate_credentials(self, key):
+        try:
+            credentials = super().authenticate_credentials(key)
+        except AuthenticationFailed:
+            metrics.inc("api_token_auth_total", result="failure")
+            raise
+        metrics.inc("api_token_auth_total", result="success")
+        return credentials
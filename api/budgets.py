@@ -0,0 +1,128 @@
+"""Budget status shared by the budgets API, the chatbot and the dashboard
+
+Limits are stored per month. Spending comes from the per-user column store,
+so a status for every budget costs the budgets query plus the (cached)
+expense columns, however many budgets there are. Limits are written with one
+``INSERT ... ON CONFLICT (user, category) DO UPDATE`` however many are set.
+"""
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.utils import timezone
+
+from api.analytics import get_columns
+from api.models import Budget, Category
+from api.versioning import bump_data_version
+
+PERIODS = ("month", "week", "custom")
+DAYS_PER_MONTH = Decimal("365.25") / 12
+MAX_LIMIT = Decimal("99999999.99")
+MAX_BULK_BUDGETS = 500
+
+
+def period_bounds(period="month", start=None, end=None, today=None):
+    """Inclusive ``(start, end)`` dates of a budget period
+
+    Raises ``ValueError`` for an unknown period or an invalid custom range.
+    """
+    today = today or timezone.now().date()
+    if period == "month":
+        last_day = calendar.monthrange(today.year, today.month)[1]
+        return today.replace(day=1), today.replace(day=last_day)
+    if period == "week":
+        monday = today - timedelta(days=today.weekday())
+        return monday, monday + timedelta(days=6)
+    if period == "custom":
+        if start is None or end is None or start > end:
+            raise ValueError("custom periods need a start on or before the end")
+        return start, end
+    raise ValueError(f"period must be one of: {', '.join(PERIODS)}")
+
+
+def period_limit(limit, period, start, end):
+    """Scale a monthly limit to the period (months are used as-is)"""
+    if period == "month":
+        return limit
+    days = (end - start).days + 1
+    return (limit * days / DAYS_PER_MONTH).quantize(Decimal("0.01"))
+
+
+def budget_status(user, period="month", start=None, end=None):
+    """Spent, remaining and percentage of every budget for the period"""
+    start, end = period_bounds(period, start, end)
+    budgets = Budget.objects.filter(user=user).select_related("category")
+
+    columns = get_columns(user)
+    # The column store's end is exclusive; nothing lies past date.max
+    period_totals = columns.category_totals(start=start, end=end + timedelta(days=1) if end < date.max else None)
+    all_time_totals = columns.category_totals()
+
+    rows = []
+    for budget in budgets:
+        name = budget.category.name
+        limit = period_limit(budget.limit, period, start, end)
+        spent = period_totals.get(name, Decimal(0))
+        rows.append(
+            {
+                "id": budget.id,
+                "category": budget.category_id,
+                "category_name": name,
+                "limit": budget.limit,
+                "period_limit": limit,
+                "spent": spent,
+                "total_spent": all_time_totals.get(name, Decimal(0)),
+                "percentage": round(spent / limit * 100, 1) if limit > 0 else 0,
+                "remaining": limit - spent,
+            }
+        )
+    return start, end, rows
+
+
+def parse_category_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError("Category must be an id")
+
+
+def parse_limit(value):
+    """Validate a budget limit, raising ``ValueError`` with the API's message"""
+    try:
+        limit = Decimal(str(value)).quantize(Decimal("0.01"))
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError("Limit must be a valid number")
+    if not limit.is_finite() or limit > MAX_LIMIT:
+        raise ValueError("Limit must be a valid number")
+    if limit < 0:
+        raise ValueError("Limit must be a positive number")
+    return limit
+
+
+def upsert_budgets(user, limits):
+    """Set monthly limits for ``{category_id: Decimal}`` in one statement
+
+    Returns ``(budgets, created_ids)``. Raises ``Category.DoesNotExist`` when a
+    category is not the user's.
+    """
+    # Ownership check, and which categories already have a budget
+    existing = dict(
+        Category.objects.filter(user=user, id__in=limits).values_list("id", "budget__id")
+    )
+    if len(existing) != len(limits):
+        raise Category.DoesNotExist()
+
+    Budget.objects.bulk_create(
+        [Budget(user=user, category_id=category_id, limit=limit) for category_id, limit in limits.items()],
+        update_conflicts=True,
+        unique_fields=["user", "category"],
+        update_fields=["limit", "updated_at"],
+    )
+    # bulk_create sends no post_save, so invalidate cached responses here
+    bump_data_version(user.pk)
+
+    budgets = list(
+        Budget.objects.filter(user=user, category_id__in=limits).select_related("category").order_by("category__name")
+    )
+    created_ids = {budget.id for budget in budgets if existing[budget.category_id] is None}
+    return budgets, created_ids
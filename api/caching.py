@@ -0,0 +1,76 @@
+"""Read-through response cache for the chatbot handlers in ``api.utils``
+
+Entries are keyed by user, data version, FX table and day, so writes never
+need to invalidate anything: a bumped version simply stops matching and old
+entries age out. Concurrent misses for the same key are collapsed behind a
+short-lived lock in the cache itself so only one caller recomputes.
+"""
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.response import Response
+
+from api import metrics
+from api.currency import rate_table
+from api.versioning import get_data_version
+
+_MISSING = object()
+
+
+def _cache():
+    return caches[settings.HANDLER_CACHE["ALIAS"]]
+
+
+def cached_handler(func):
+    """Memoize a ``handler(user, *args, **kwargs)`` returning a ``Response``"""
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(user, *args, **kwargs):
+        if not settings.HANDLER_CACHE["ENABLED"]:
+            return func(user, *args, **kwargs)
+
+        cache = _cache()
+        version = get_data_version(user)
+        key = f"handler:{name}:{user.pk}:{version}:{rate_table().version}:{timezone.now().date()}"
+        if args or kwargs:
+            key += ":" + ":".join([*map(str, args), *(f"{k}={v}" for k, v in sorted(kwargs.items()))])
+
+        cached = cache.get(key, _MISSING)
+        if cached is _MISSING:
+            cached = _fill(cache, key, lambda: func(user, *args, **kwargs))
+        else:
+            metrics.inc("api_cache_requests_total", cache="handlers", result="hit")
+        data, status_code = cached
+        return Response(data, status=status_code)
+
+    return wrapper
+
+
+def _fill(cache, key, compute):
+    """Compute and store ``key``, letting only one caller do the work at a time"""
+    options = settings.HANDLER_CACHE
+    lock_key = f"{key}:lock"
+    locked = cache.add(lock_key, 1, timeout=options["LOCK_TIMEOUT"])
+    if not locked:
+        # Someone else is computing it: wait briefly for their result
+        deadline = time.monotonic() + options["LOCK_WAIT"]
+        while time.monotonic() < deadline:
+            time.sleep(0.02)
+            cached = cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                metrics.inc("api_cache_requests_total", cache="handlers", result="hit")
+                return cached
+
+    metrics.inc("api_cache_requests_total", cache="handlers", result="miss")
+    try:
+        response = compute()
+        cached = (response.data, response.status_code)
+        cache.set(key, cached, timeout=options["TIMEOUT"])
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return cached
@@ -0,0 +1,188 @@
+"""Response compression for API bodies (gzip, and brotli when installed)
+
+Only responses whose media type is in ``COMPRESSION["CONTENT_TYPES"]`` and
+whose body is at least ``COMPRESSION["MIN_SIZE"]`` bytes are compressed:
+below that the CPU and the encoding framing cost more than the bytes saved.
+HTML is left out of the default allow-list on purpose: the admin's pages
+carry session-bound CSRF tokens next to reflected input, the BREACH setup.
+API responses are token-authenticated through a header a cross-site page
+cannot send, so compressing them is safe.
+
+Streaming responses are compressed chunk by chunk as they are sent, without
+flushing after every chunk, so a large export keeps its compression ratio.
+Static files never get here: WhiteNoise serves the ``.gz``/``.br`` variants
+built by ``collectstatic``.
+"""
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+
+from api import metrics
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# Nothing to compress, or a byte range of the identity encoding
+SKIP_STATUSES = frozenset({204, 206, 304})
+
+
+def compression_settings():
+    config = {
+        "ENABLED": True,
+        "MIN_SIZE": 1024,
+        "CONTENT_TYPES": ["application/json"],
+        "ENCODINGS": ["br", "gzip"],
+        "GZIP_LEVEL": 6,
+        "BROTLI_QUALITY": 4,
+    }
+    config.update(getattr(settings, "COMPRESSION", {}))
+    return config
+
+
+def available_encodings(preferred):
+    """The encodings in ``preferred`` this process can produce, in order"""
+    return [encoding for encoding in preferred if encoding == "gzip" or (encoding == "br" and brotli is not None)]
+
+
+def choose_encoding(header, encodings):
+    """Pick the best of ``encodings`` (server preference order) for an Accept-Encoding header"""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compressor(encoding, options):
+    """``(process, finish)`` callables of a new compression stream"""
+    if encoding == "br":
+        stream = brotli.Compressor(quality=options["BROTLI_QUALITY"], mode=brotli.MODE_TEXT)
+        return stream.process, stream.finish
+    stream = zlib.compressobj(options["GZIP_LEVEL"], zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    return stream.compress, stream.flush
+
+
+def compress(data, encoding, options):
+    process, finish = compressor(encoding, options)
+    return process(data) + finish()
+
+
+def _record(encoding, raw, compressed):
+    metrics.inc("api_compression_input_bytes_total", raw, encoding=encoding)
+    metrics.inc("api_compression_output_bytes_total", compressed, encoding=encoding)
+
+
+def compress_stream(chunks, encoding, options):
+    process, finish = compressor(encoding, options)
+    raw = compressed = 0
+    for chunk in chunks:
+        raw += len(chunk)
+        data = process(chunk)
+        if data:
+            compressed += len(data)
+            yield data
+    data = finish()
+    _record(encoding, raw, compressed + len(data))
+    yield data
+
+
+async def compress_async_stream(chunks, encoding, options):
+    process, finish = compressor(encoding, options)
+    raw = compressed = 0
+    async for chunk in chunks:
+        raw += len(chunk)
+        data = process(chunk)
+        if data:
+            compressed += len(data)
+            yield data
+    data = finish()
+    _record(encoding, raw, compressed + len(data))
+    yield data
+
+
+class CompressionMiddleware:
+    """Compress eligible responses with the best encoding the client accepts
+
+    Configured through ``settings.COMPRESSION``.
+    """
+
+    def __init__(self, get_response):
+        options = compression_settings()
+        if not options["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.options = options
+        self.min_size = options["MIN_SIZE"]
+        self.content_types = frozenset(options["CONTENT_TYPES"])
+        self.encodings = available_encodings(options["ENCODINGS"])
+
+    def compressible(self, response):
+        if response.status_code in SKIP_STATUSES or response.has_header("Content-Encoding"):
+            return False
+        media_type = response.get("Content-Type", "").partition(";")[0].strip().lower()
+        return media_type in self.content_types
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.compressible(response):
+            return response
+
+        # The representation depends on Accept-Encoding whenever it could be compressed
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""), self.encodings)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            length = response.get("Content-Length")
+            if length is not None and int(length) < self.min_size:
+                return response
+            if response.is_async:
+                response.streaming_content = compress_async_stream(
+                    response.streaming_content, encoding, self.options
+                )
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding, self.options)
+            del response["Content-Length"]
+        else:
+            content = response.content
+            if len(content) < self.min_size:
+                return response
+            compressed = compress(content, encoding, self.options)
+            if len(compressed) >= len(content):
+                return response
+            _record(encoding, len(content), len(compressed))
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # The bytes differ per encoding, so a strong validator would be wrong
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = f"W/{etag}"
+        response["Content-Encoding"] = encoding
+        return response
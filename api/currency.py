@@ -0,0 +1,127 @@
+"""Currencies, FX conversion and money formatting
+
+Rates come from a JSON file (``settings.CURRENCY["RATES_FILE"]``) giving the
+value of one unit of each currency in the file's base currency. The table is
+parsed once per process and re-read when the file's mtime changes; the mtime
+is checked at most every ``RELOAD_CHECK_SECONDS``.
+Aggregates are converted into the display currency in bulk: a ``CASE``
+expression for SQL sums, a rate array for NumPy columns.
+"""
+import json
+import os
+import threading
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Case, DecimalField, F, Value, When
+
+SYMBOLS = {
+    "INR": "₹",
+    "USD": "$",
+    "EUR": "€",
+    "GBP": "£",
+    "JPY": "¥",
+    "AED": "AED ",
+    "SGD": "S$",
+    "AUD": "A$",
+    "CAD": "C$",
+    "CHF": "CHF ",
+}
+
+
+class RateTable:
+    """Parsed rates file; ``version`` changes whenever the file does"""
+
+    def __init__(self, base, as_of, rates, version):
+        self.base = base
+        self.as_of = as_of
+        self.rates = rates  # currency -> Decimal value in base
+        self.version = version
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+        rates = {code.upper(): Decimal(str(value)) for code, value in data["rates"].items()}
+        rates.setdefault(data["base"], Decimal(1))
+        return cls(data["base"], data.get("as_of"), rates, os.stat(path).st_mtime_ns)
+
+    def factor(self, currency, to):
+        """Multiplier turning an amount in ``currency`` into ``to``"""
+        return self.rates[currency] / self.rates[to]
+
+
+_lock = threading.Lock()
+_table = None
+# (path, monotonic time) of the last mtime check; rates files change rarely
+_checked = (None, 0.0)
+
+
+def rate_table():
+    """The current rate table, reloaded only when the file changed"""
+    global _table, _checked
+    path = settings.CURRENCY["RATES_FILE"]
+    now = time.monotonic()
+    table = _table
+    checked_path, checked_at = _checked
+    if table is not None and checked_path == path and now - checked_at < settings.CURRENCY["RELOAD_CHECK_SECONDS"]:
+        return table
+
+    mtime = os.stat(path).st_mtime_ns
+    if table is None or table.version != mtime or checked_path != path:
+        with _lock:
+            if _table is None or _table.version != mtime or _checked[0] != path:
+                _table = RateTable.load(path)
+            table = _table
+    _checked = (path, now)
+    return table
+
+
+def display_currency():
+    return settings.CURRENCY["DISPLAY"]
+
+
+def supported_currencies():
+    return sorted(rate_table().rates)
+
+
+def convert(amount, currency, to=None):
+    """Convert a single Decimal amount, rounded to 2 places"""
+    to = to or display_currency()
+    if currency == to:
+        return amount
+    return (Decimal(amount) * rate_table().factor(currency, to)).quantize(Decimal("0.01"))
+
+
+def factors(currencies, to=None):
+    """NumPy array of conversion factors, one per currency code"""
+    to = to or display_currency()
+    table = rate_table()
+    return np.array([float(table.factor(code, to)) for code in currencies], dtype=np.float64)
+
+
+def converted_amount(field="amount", currency_field="currency", to=None):
+    """SQL expression for ``field`` converted into the display currency"""
+    to = to or display_currency()
+    table = rate_table()
+    whens = [
+        When(**{currency_field: code}, then=F(field) * Value(table.factor(code, to)))
+        for code in sorted(table.rates)
+        if code != to
+    ]
+    if not whens:
+        return F(field)
+    return Case(
+        *whens,
+        default=F(field),
+        output_field=DecimalField(max_digits=20, decimal_places=6),
+    )
+
+
+def format_money(amount, currency=None):
+    """``₹1234.50`` style string for an amount in ``currency`` (display by default)"""
+    currency = currency or display_currency()
+    symbol = SYMBOLS.get(currency, f"{currency} ")
+    return f"{symbol}{amount or 0:.2f}"
@@ -0,0 +1,208 @@
+"""Vectorized monthly forecasting across all categories at once
+
+Every model takes a dense ``(categories x months)`` matrix of monthly totals
+and returns point forecasts with prediction intervals for each row. Rows may
+start late (leading zero months before a category was first used); those
+months are masked out of fitting.
+"""
+import numpy as np
+
+MODELS = ("linear", "ses", "seasonal_naive", "holt_winters")
+SEASON = 12
+Z_SCORES = {0.5: 0.6745, 0.8: 1.2816, 0.9: 1.6449, 0.95: 1.96, 0.99: 2.5758}
+
+SES_ALPHAS = np.linspace(0.05, 0.95, 19)
+HW_GRID = [
+    (alpha, beta, gamma)
+    for alpha in (0.1, 0.3, 0.5, 0.7)
+    for beta in (0.01, 0.1, 0.3)
+    for gamma in (0.1, 0.3, 0.5)
+]
+
+
+def active_mask(series):
+    """True from each row's first non-zero month onwards"""
+    return np.cumsum(series > 0, axis=1) > 0
+
+
+def fit_linear(series, active, horizon):
+    """Weighted least-squares trend line per row"""
+    n = series.shape[1]
+    t = np.arange(n, dtype=np.float64)
+    weights = active.astype(np.float64)
+    count = weights.sum(axis=1)
+    safe_count = np.maximum(count, 1)
+    t_mean = (weights * t).sum(axis=1) / safe_count
+    y_mean = (weights * series).sum(axis=1) / safe_count
+    t_dev = t - t_mean[:, None]
+    sxx = (weights * t_dev**2).sum(axis=1)
+    safe_sxx = np.where(sxx > 0, sxx, 1)
+    slope = (weights * t_dev * (series - y_mean[:, None])).sum(axis=1) / safe_sxx
+    intercept = y_mean - slope * t_mean
+
+    fitted = intercept[:, None] + slope[:, None] * t
+    residual_ss = (weights * (series - fitted) ** 2).sum(axis=1)
+    sigma = np.sqrt(residual_ss / np.maximum(count - 2, 1))
+
+    future_t = n - 1 + np.arange(1, horizon + 1, dtype=np.float64)
+    mean = intercept[:, None] + slope[:, None] * future_t
+    spread = np.sqrt(
+        1 + 1 / safe_count[:, None] + (future_t - t_mean[:, None]) ** 2 / safe_sxx[:, None]
+    )
+    return mean, sigma[:, None] * spread
+
+
+def _ses_filter(series, active, alpha):
+    n = series.shape[1]
+    level = series[:, 0].copy()
+    started = active[:, 0].copy()
+    sse = np.zeros(series.shape[0])
+    steps = np.zeros(series.shape[0])
+    for t in range(1, n):
+        error = series[:, t] - level
+        update = active[:, t] & started
+        sse += np.where(update, error**2, 0)
+        steps += update
+        level = np.where(update, level + alpha * error, np.where(active[:, t], series[:, t], level))
+        started |= active[:, t]
+    return level, sse, steps
+
+
+def fit_ses(series, active, horizon):
+    """Simple exponential smoothing, alpha picked per row by one-step SSE"""
+    best_sse = np.full(series.shape[0], np.inf)
+    best_level = np.zeros(series.shape[0])
+    best_alpha = np.zeros(series.shape[0])
+    best_steps = np.ones(series.shape[0])
+    for alpha in SES_ALPHAS:
+        level, sse, steps = _ses_filter(series, active, alpha)
+        better = sse < best_sse
+        best_sse = np.where(better, sse, best_sse)
+        best_level = np.where(better, level, best_level)
+        best_alpha = np.where(better, alpha, best_alpha)
+        best_steps = np.where(better, steps, best_steps)
+
+    sigma = np.sqrt(best_sse / np.maximum(best_steps, 1))
+    h = np.arange(1, horizon + 1)
+    mean = np.repeat(best_level[:, None], horizon, axis=1)
+    spread = np.sqrt(1 + (h[None, :] - 1) * best_alpha[:, None] ** 2)
+    return mean, sigma[:, None] * spread
+
+
+def fit_seasonal_naive(series, active, horizon):
+    """Repeat the same calendar month of the last observed year"""
+    n = series.shape[1]
+    h = np.arange(1, horizon + 1)
+    source = n - 1 + h - SEASON * np.ceil(h / SEASON).astype(int)
+    mean = series[:, np.clip(source, 0, n - 1)]
+
+    if n > SEASON:
+        diffs = series[:, SEASON:] - series[:, :-SEASON]
+        usable = active[:, :-SEASON]
+        sigma = np.sqrt((np.where(usable, diffs, 0) ** 2).sum(axis=1) / np.maximum(usable.sum(axis=1), 1))
+    else:
+        sigma = np.zeros(series.shape[0])
+    spread = np.sqrt(np.ceil(h / SEASON))
+    return mean, sigma[:, None] * spread[None, :]
+
+
+def _holt_winters_filter(series, start, alpha, beta, gamma):
+    rows, n = series.shape
+    idx = np.arange(rows)
+    season_idx = np.clip(start[:, None] + np.arange(SEASON), 0, n - 1)
+    next_idx = np.clip(season_idx + SEASON, 0, n - 1)
+    first_season = series[idx[:, None], season_idx]
+    first_mean = first_season.mean(axis=1)
+    trend = (series[idx[:, None], next_idx].mean(axis=1) - first_mean) / SEASON
+    # Detrended seasonal indices, level as of the end of the first season
+    offsets = np.arange(SEASON) - (SEASON - 1) / 2
+    seasonal = np.zeros((rows, SEASON))
+    seasonal[idx[:, None], season_idx % SEASON] = (
+        first_season - first_mean[:, None] - trend[:, None] * offsets
+    )
+    level = first_mean + trend * (SEASON - 1) / 2
+
+    sse = np.zeros(rows)
+    steps = np.zeros(rows)
+    for t in range(n):
+        update = t >= start + SEASON
+        phase = t % SEASON
+        prediction = level + trend + seasonal[:, phase]
+        error = series[:, t] - prediction
+        sse += np.where(update, error**2, 0)
+        steps += update
+
+        new_level = alpha * (series[:, t] - seasonal[:, phase]) + (1 - alpha) * (level + trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        new_seasonal = gamma * (series[:, t] - new_level) + (1 - gamma) * seasonal[:, phase]
+        level = np.where(update, new_level, level)
+        trend = np.where(update, new_trend, trend)
+        seasonal[:, phase] = np.where(update, new_seasonal, seasonal[:, phase])
+    return level, trend, seasonal, sse, steps
+
+
+def fit_holt_winters(series, active, horizon):
+    """Additive Holt-Winters (12-month season), parameters picked by grid search"""
+    rows, n = series.shape
+    start = np.argmax(active, axis=1)
+    h = np.arange(1, horizon + 1)
+    phases = (n - 1 + h) % SEASON
+
+    best_sse = np.full(rows, np.inf)
+    mean = np.zeros((rows, horizon))
+    best_steps = np.ones(rows)
+    for alpha, beta, gamma in HW_GRID:
+        level, trend, seasonal, sse, steps = _holt_winters_filter(series, start, alpha, beta, gamma)
+        better = sse < best_sse
+        candidate = level[:, None] + h[None, :] * trend[:, None] + seasonal[:, phases]
+        mean = np.where(better[:, None], candidate, mean)
+        best_sse = np.where(better, sse, best_sse)
+        best_steps = np.where(better, steps, best_steps)
+
+    sigma = np.sqrt(best_sse / np.maximum(best_steps, 1))
+    return mean, sigma[:, None] * np.sqrt(h)[None, :]
+
+
+FITTERS = {
+    "linear": fit_linear,
+    "ses": fit_ses,
+    "seasonal_naive": fit_seasonal_naive,
+    "holt_winters": fit_holt_winters,
+}
+
+
+def resolve_models(model, active):
+    """Per-row model name, falling back when a row is too short for seasonality"""
+    history = active.sum(axis=1)
+    chosen = np.full(active.shape[0], model, dtype="<U14")
+    if model == "holt_winters":
+        chosen = np.where(history < 2 * SEASON, "seasonal_naive", chosen)
+    if model in ("holt_winters", "seasonal_naive"):
+        chosen = np.where(history < SEASON, "ses", chosen)
+    return chosen
+
+
+def forecast(series, model="linear", horizon=3, interval=0.8):
+    """Forecast every row of ``series``
+
+    Returns ``(mean, lower, upper, models)``; arrays are ``(rows x horizon)``,
+    clipped at zero, and ``models`` names the model actually used per row.
+    """
+    if model not in FITTERS:
+        raise ValueError(f"Unknown model '{model}', expected one of {', '.join(MODELS)}")
+    if interval not in Z_SCORES:
+        raise ValueError(f"Unsupported interval {interval}, expected one of {sorted(Z_SCORES)}")
+
+    series = np.asarray(series, dtype=np.float64)
+    active = active_mask(series)
+    models = resolve_models(model, active)
+    mean = np.zeros((series.shape[0], horizon))
+    spread = np.zeros((series.shape[0], horizon))
+    for name in np.unique(models):
+        rows = models == name
+        mean[rows], spread[rows] = FITTERS[name](series[rows], active[rows], horizon)
+
+    z = Z_SCORES[interval]
+    lower = np.maximum(mean - z * spread, 0)
+    upper = np.maximum(mean + z * spread, 0)
+    return np.maximum(mean, 0), lower, upper, list(models)
@@ -0,0 +1,146 @@
+"""``Idempotency-Key`` support for writes that clients retry
+
+The first request with a key claims it by inserting an ``IdempotencyKey`` row
+(unique per user), runs the view and stores the status code and body. A retry
+with the same key and the same request body gets the stored response back
+without touching the data again. Requests that fail with an exception or a
+5xx release the key so a retry runs normally; views must let unexpected
+errors raise rather than turn them into a 4xx that would be replayed. A claim whose request died
+without finishing (worker timeout, OOM kill) is only held for
+``IDEMPOTENCY["LEASE_SECONDS"]``, after which a retry takes it over. Keys live for
+``IDEMPOTENCY["TTL_SECONDS"]``; expired rows are reused in place and deleted by
+``prune_idempotency_keys``.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from api import metrics
+from api.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+
+
+def _digest(*parts):
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def _fingerprint(request):
+    data = request.data
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    return _digest(request.method, request.path, json.dumps(data, sort_keys=True, default=str))
+
+
+def _claim(request, key, fingerprint):
+    """Return ``(record, owner)``: the new key row, or the existing one for a retry"""
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.IDEMPOTENCY["TTL_SECONDS"])
+    # Read first: retries are the case worth making cheap
+    record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+    lease_start = now - timedelta(seconds=settings.IDEMPOTENCY["LEASE_SECONDS"])
+    abandoned = record is not None and record.status_code is None and record.created_at <= lease_start
+    if record is not None and record.expires_at > now and not abandoned:
+        return record, False
+
+    if record is not None:
+        # An expired key starts over, as if it had been pruned already, and so
+        # does a claim whose request never finished
+        reclaimed = (
+            IdempotencyKey.objects.filter(pk=record.pk)
+            .filter(Q(expires_at__lte=now) | Q(status_code__isnull=True, created_at__lte=lease_start))
+            .update(
+                fingerprint=fingerprint, status_code=None, response=None, created_at=now, expires_at=expires_at
+            )
+        )
+        if reclaimed:
+            record.fingerprint, record.created_at, record.expires_at = fingerprint, now, expires_at
+            return record, True
+    else:
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=request.user, key=key, fingerprint=fingerprint, expires_at=expires_at
+                )
+            return record, True
+        except IntegrityError:
+            pass
+
+    # Lost a race with a concurrent request using the same key
+    return IdempotencyKey.objects.filter(user=request.user, key=key).first(), False
+
+
+def idempotent(view_method):
+    """Replay the stored response when a view is retried with the same ``Idempotency-Key``"""
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        raw_key = request.headers.get(HEADER)
+        if raw_key is None:
+            return view_method(self, request, *args, **kwargs)
+        if not raw_key.strip() or len(raw_key) > settings.IDEMPOTENCY["MAX_KEY_LENGTH"]:
+            return Response(
+                {"error": f"{HEADER} must be 1-{settings.IDEMPOTENCY['MAX_KEY_LENGTH']} characters"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = _fingerprint(request)
+        record, owner = _claim(request, _digest(raw_key), fingerprint)
+        if record is None:
+            # Pruned between our insert attempt and the lookup; let the client retry
+            owner = False
+        if not owner:
+            return _replay(record, fingerprint)
+
+        metrics.inc("api_idempotency_requests_total", result="new")
+        # Matching created_at too: a retry may have taken over an overrun lease
+        claim = IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at)
+        try:
+            # The write and its stored response commit together: a worker dying in
+            # between leaves neither, so a retry after the lease writes only once
+            with transaction.atomic():
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code < 500:
+                    claim.update(status_code=response.status_code, response=response.data)
+        except Exception:
+            claim.delete()
+            raise
+        if response.status_code >= 500:
+            # Nothing to replay; a retry should run the write again
+            claim.delete()
+        return response
+
+    return wrapper
+
+
+def _replay(record, fingerprint):
+    if record is not None and record.fingerprint != fingerprint:
+        metrics.inc("api_idempotency_requests_total", result="mismatch")
+        return Response(
+            {"error": f"{HEADER} was already used for a different request"},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record is None or record.status_code is None:
+        metrics.inc("api_idempotency_requests_total", result="in_progress")
+        return Response(
+            {"error": f"A request with this {HEADER} is still being processed"},
+            status=status.HTTP_409_CONFLICT,
+            headers={"Retry-After": "1"},
+        )
+
+    metrics.inc("api_idempotency_requests_total", result="replayed")
+    return Response(record.response, status=record.status_code, headers={"Idempotent-Replayed": "true"})
+
+
+def prune_idempotency_keys(now=None):
+    """Delete expired keys; returns how many were removed"""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
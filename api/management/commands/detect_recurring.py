@@ -0,0 +1,30 @@
+import time
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from api.recurring import run_detection
+
+
+class Command(BaseCommand):
+    help = "Detect recurring expenses for users whose expenses changed since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Re-scan every user instead of only changed ones")
+        parser.add_argument("--loop", action="store_true", help="Keep re-running instead of exiting after one pass")
+        parser.add_argument("--interval", type=float, default=300.0, help="Seconds to sleep between runs with --loop")
+
+    def handle(self, *args, **options):
+        full = options["full"]
+        while True:
+            started = perf_counter()
+            processed, changed = run_detection(full=full)
+            elapsed = perf_counter() - started
+            if processed or not options["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Scanned {processed} users, updated {changed} in {elapsed:.2f}s")
+                )
+            if not options["loop"]:
+                break
+            full = False
+            time.sleep(options["interval"])
@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.alerts import deliver_notifications, process_events
+
+
+class Command(BaseCommand):
+    help = "Turn queued expense events into budget/anomaly notifications and email them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--loop", action="store_true", help="Keep polling the queue instead of exiting when empty")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds to sleep between polls with --loop")
+        parser.add_argument("--no-email", action="store_true", help="Only create notifications")
+
+    def handle(self, *args, **options):
+        send_email = settings.ALERTS["EMAIL"] and not options["no_email"]
+        while True:
+            events = notifications = 0
+            while True:
+                processed, created = process_events(options["batch_size"])
+                events += processed
+                notifications += created
+                if not processed:
+                    break
+            emails = deliver_notifications() if send_email else 0
+            if events or emails:
+                self.stdout.write(f"{events} events -> {notifications} notifications, {emails} emails")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS("Done"))
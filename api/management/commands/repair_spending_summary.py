@@ -0,0 +1,22 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from api.summary import rebuild
+from api.versioning import bump_data_version
+
+
+class Command(BaseCommand):
+    help = "Recompute per-user spending counters from the expenses table and fix any that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="users", help="Only check this user id (repeatable)")
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        drifted = rebuild(options["users"])
+        for user_id in drifted:
+            # Cached answers were computed from the stale counters
+            bump_data_version(user_id)
+        elapsed = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Repaired {len(drifted)} users in {elapsed:.2f}s"))
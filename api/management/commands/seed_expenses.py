@@ -0,0 +1,134 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from api.models import Budget, Category, Expense, FinancialGoal
+from api.summary import rebuild
+from api.versioning import bump_data_version
+
+# name: (share of expenses, lognormal median amount, lognormal sigma, descriptions)
+CATEGORY_PROFILES = {
+    "Food": (0.32, 350, 0.6, ["Groceries", "Swiggy order", "Zomato order", "Cafe", "Bakery", "Restaurant dinner"]),
+    "Transport": (0.18, 220, 0.7, ["Uber ride", "Ola ride", "Metro card recharge", "Fuel", "Parking"]),
+    "Shopping": (0.14, 1200, 0.9, ["Amazon order", "Flipkart order", "Clothes", "Shoes", "Electronics"]),
+    "Utilities": (0.08, 900, 0.4, ["Electricity bill", "Water bill", "Mobile recharge", "Broadband bill"]),
+    "Entertainment": (0.09, 450, 0.7, ["Netflix subscription", "Spotify subscription", "Movie tickets", "Concert"]),
+    "Health": (0.06, 800, 0.8, ["Pharmacy", "Doctor visit", "Gym membership", "Lab tests"]),
+    "Rent": (0.03, 18000, 0.15, ["Rent payment"]),
+    "Travel": (0.05, 4500, 0.9, ["Flight tickets", "Hotel booking", "Train tickets", "Bus tickets"]),
+    "Education": (0.05, 1500, 0.8, ["Books", "Online course", "Tuition fees"]),
+}
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic users, categories, budgets, goals and expenses for benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--expenses", type=int, default=100_000, help="Total expenses across all users")
+        parser.add_argument("--months", type=int, default=24, help="History length ending today")
+        parser.add_argument("--prefix", default="bench_", help="Username prefix of generated users")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--clear", action="store_true", help="Delete previously generated users first")
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        prefix = options["prefix"]
+
+        if options["clear"]:
+            deleted, _ = User.objects.filter(username__startswith=prefix).delete()
+            self.stdout.write(f"Deleted {deleted} rows from previous runs")
+
+        # Heavier users get more expenses, like real usage (Zipf-ish weights)
+        weights = 1 / np.arange(1, options["users"] + 1) ** 0.8
+        per_user = np.floor(weights / weights.sum() * options["expenses"]).astype(int)
+        per_user[0] += options["expenses"] - per_user.sum()
+
+        for idx, count in enumerate(per_user):
+            user = self.create_user(f"{prefix}{idx}", rng)
+            self.create_expenses(user, int(count), rng, options)
+            # bulk_create skips the signals that maintain the counters
+            rebuild([user.pk])
+            bump_data_version(user.pk)
+            self.stdout.write(f"{user.username}: {count} expenses")
+
+        self.stdout.write(self.style.SUCCESS(f"Seeded {options['users']} users / {options['expenses']} expenses"))
+
+    @transaction.atomic
+    def create_user(self, username, rng):
+        User.objects.filter(username=username).delete()
+        user = User.objects.create_user(
+            username=username, email=f"{username}@example.com", password="bench-password"
+        )
+        Token.objects.create(user=user)
+
+        categories = Category.objects.bulk_create(
+            [Category(user=user, name=name) for name in CATEGORY_PROFILES]
+        )
+        Budget.objects.bulk_create(
+            [
+                Budget(
+                    user=user,
+                    category=category,
+                    limit=Decimal(int(CATEGORY_PROFILES[category.name][1] * rng.uniform(8, 20))),
+                )
+                for category in categories
+                if rng.random() < 0.7
+            ]
+        )
+        today = date.today()
+        FinancialGoal.objects.bulk_create(
+            [
+                FinancialGoal(
+                    user=user,
+                    name=name,
+                    targetAmount=Decimal(target),
+                    currentAmount=Decimal(int(target * rng.uniform(0, 0.9))),
+                    deadline=today + timedelta(days=int(rng.integers(60, 900))),
+                )
+                for name, target in [("Emergency fund", 200000), ("Vacation", 80000), ("New laptop", 120000)]
+                if rng.random() < 0.8
+            ]
+        )
+        return user
+
+    def create_expenses(self, user, count, rng, options):
+        names = list(CATEGORY_PROFILES)
+        shares = np.array([CATEGORY_PROFILES[name][0] for name in names])
+        category_idx = rng.choice(len(names), size=count, p=shares / shares.sum())
+
+        medians = np.array([CATEGORY_PROFILES[name][1] for name in names])
+        sigmas = np.array([CATEGORY_PROFILES[name][2] for name in names])
+        amounts = np.round(
+            rng.lognormal(np.log(medians[category_idx]), sigmas[category_idx]), 2
+        ).clip(1, 99_999_999)
+
+        # Recent months are denser, like an account that is actively used
+        days = options["months"] * 30
+        offsets = np.minimum(rng.exponential(days / 2.5, size=count), days - 1).astype(int)
+        today = date.today()
+
+        batch = []
+        for cat, amount, offset in zip(category_idx, amounts, offsets):
+            name = names[cat]
+            descriptions = CATEGORY_PROFILES[name][3]
+            batch.append(
+                Expense(
+                    user=user,
+                    amount=Decimal(f"{amount:.2f}"),
+                    description=descriptions[rng.integers(len(descriptions))],
+                    category=name,
+                    date=today - timedelta(days=int(offset)),
+                )
+            )
+            if len(batch) >= options["batch_size"]:
+                Expense.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Expense.objects.bulk_create(batch)
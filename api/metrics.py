@@ -0,0 +1,306 @@
+"""Prometheus metrics aggregated across gunicorn workers
+
+Every process keeps its counters and histograms in memory and periodically
+snapshots them to ``<METRICS["DIR"]>/<pid>-<start>.json``. The metrics
+endpoint sums all snapshots, folding the files of dead workers into a shared
+archive so counters stay monotonic across worker restarts.
+"""
+import atexit
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from collections import defaultdict
+from time import monotonic, perf_counter, time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from api.profiling import QueryTimer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ARCHIVE_FILE = "archive.json"
+
+
+def metrics_settings():
+    config = {
+        "ENABLED": True,
+        "DIR": os.path.join(tempfile.gettempdir(), "expense_tracker_metrics"),
+        "FLUSH_INTERVAL": 1.0,
+    }
+    config.update(getattr(settings, "METRICS", {}))
+    return config
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class MetricStore:
+    """Per-process metric values plus the file-backed cross-process merge"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._path = None
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._last_flush = 0.0
+
+    def _check_fork(self):
+        # A forked worker must not re-export what its parent already wrote
+        if self._pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._check_fork()
+            self._counters[_key(name, labels)] += value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        with self._lock:
+            self._check_fork()
+            key = _key(name, labels)
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {
+                    "buckets": list(buckets),
+                    "counts": [0] * (len(buckets) + 1),
+                    "sum": 0.0,
+                }
+            idx = next(
+                (i for i, bound in enumerate(buckets) if value <= bound), len(buckets)
+            )
+            hist["counts"][idx] += 1
+            hist["sum"] += value
+
+    def _snapshot(self):
+        return {
+            "counters": [
+                [name, list(labels), value]
+                for (name, labels), value in self._counters.items()
+            ],
+            "histograms": [
+                [name, list(labels), hist["buckets"], hist["counts"], hist["sum"]]
+                for (name, labels), hist in self._histograms.items()
+            ],
+        }
+
+    def flush(self, force=False):
+        """Write this process' snapshot, at most once per FLUSH_INTERVAL"""
+        config = metrics_settings()
+        now = monotonic()
+        with self._lock:
+            self._check_fork()
+            if not force and now - self._last_flush < config["FLUSH_INTERVAL"]:
+                return
+            self._last_flush = now
+            snapshot = self._snapshot()
+            if self._path is None:
+                os.makedirs(config["DIR"], exist_ok=True)
+                self._path = os.path.join(
+                    config["DIR"], f"{self._pid}-{int(time() * 1000)}.json"
+                )
+            path = self._path
+        _write_json(path, snapshot)
+
+    def collect(self):
+        """Merge the snapshots of every live and dead worker"""
+        self.flush(force=True)
+        directory = metrics_settings()["DIR"]
+        with _directory_lock(directory):
+            _archive_dead_workers(directory)
+            merged = _empty()
+            for filename in os.listdir(directory):
+                if filename.endswith(".json"):
+                    _merge(merged, _read_json(os.path.join(directory, filename)))
+        return merged
+
+
+def _empty():
+    return {"counters": defaultdict(float), "histograms": {}}
+
+
+def _merge(merged, snapshot):
+    for name, labels, value in snapshot.get("counters", []):
+        merged["counters"][(name, tuple(map(tuple, labels)))] += value
+    for name, labels, buckets, counts, total in snapshot.get("histograms", []):
+        key = (name, tuple(map(tuple, labels)))
+        hist = merged["histograms"].get(key)
+        if hist is None:
+            merged["histograms"][key] = {
+                "buckets": buckets,
+                "counts": list(counts),
+                "sum": total,
+            }
+        else:
+            hist["counts"] = [a + b for a, b in zip(hist["counts"], counts)]
+            hist["sum"] += total
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(data, fh)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+class _directory_lock:
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, ".lock")
+
+    def __enter__(self):
+        self.fh = open(self.path, "w")
+        fcntl.flock(self.fh, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fh, fcntl.LOCK_UN)
+        self.fh.close()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _archive_dead_workers(directory):
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    dead = []
+    for filename in os.listdir(directory):
+        pid, _, rest = filename.partition("-")
+        if rest.endswith(".json") and pid.isdigit() and not _pid_alive(int(pid)):
+            dead.append(os.path.join(directory, filename))
+    if not dead:
+        return
+
+    merged = _empty()
+    _merge(merged, _read_json(archive_path))
+    for path in dead:
+        _merge(merged, _read_json(path))
+    _write_json(archive_path, _as_snapshot(merged))
+    for path in dead:
+        os.remove(path)
+
+
+def _as_snapshot(merged):
+    return {
+        "counters": [
+            [name, [list(label) for label in labels], value]
+            for (name, labels), value in merged["counters"].items()
+        ],
+        "histograms": [
+            [name, [list(label) for label in labels], h["buckets"], h["counts"], h["sum"]]
+            for (name, labels), h in merged["histograms"].items()
+        ],
+    }
+
+
+store = MetricStore()
+
+
+@atexit.register
+def _flush_at_exit():
+    if store._counters or store._histograms:
+        store.flush(force=True)
+
+
+def _enabled():
+    return getattr(settings, "METRICS", {}).get("ENABLED", True)
+
+
+def inc(name, value=1, **labels):
+    """Increment a counter"""
+    if _enabled():
+        store.inc(name, value, **labels)
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    """Record a histogram observation"""
+    if _enabled():
+        store.observe(name, value, buckets, **labels)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render_prometheus(merged):
+    """Render merged metrics in the Prometheus text exposition format"""
+    lines = []
+    by_name = defaultdict(list)
+    for (name, labels), value in merged["counters"].items():
+        by_name[name].append((labels, value))
+    for name in sorted(by_name):
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in sorted(by_name[name]):
+            lines.append(f"{name}{_labels(labels)} {value:g}")
+
+    hist_by_name = defaultdict(list)
+    for (name, labels), hist in merged["histograms"].items():
+        hist_by_name[name].append((labels, hist))
+    for name in sorted(hist_by_name):
+        lines.append(f"# TYPE {name} histogram")
+        for labels, hist in sorted(hist_by_name[name], key=lambda item: item[0]):
+            cumulative = 0
+            bounds = [*map(lambda b: f"{b:g}", hist["buckets"]), "+Inf"]
+            for bound, count in zip(bounds, hist["counts"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {hist['sum']:g}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Record latency and SQL query counts per URL name for every request"""
+
+    def __init__(self, get_response):
+        if not metrics_settings()["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        elapsed = perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        url_name = (match.url_name if match else None) or "unresolved"
+        store.observe("api_request_duration_seconds", elapsed, url_name=url_name)
+        store.inc(
+            "api_requests_total",
+            url_name=url_name,
+            status=f"{response.status_code // 100}xx",
+        )
+        store.inc("api_db_queries_total", timer.count, url_name=url_name)
+        store.flush()
+        return response
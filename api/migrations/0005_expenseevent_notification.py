@@ -0,0 +1,47 @@
+# Generated by Django 4.2.10 on 2026-10-19 06:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0004_recurringexpense_jobwatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expense_id', models.BigIntegerField(null=True)),
+                ('category', models.CharField(max_length=100)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('date', models.DateField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('budget_threshold', 'Budget threshold'), ('budget_exceeded', 'Budget exceeded'), ('anomaly', 'Unusual expense')], max_length=20)),
+                ('category', models.CharField(max_length=100)),
+                ('message', models.CharField(max_length=255)),
+                ('dedupe_key', models.CharField(max_length=150)),
+                ('read', models.BooleanField(default=False)),
+                ('emailed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'unique_together': {('user', 'dedupe_key')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.10 on 2026-10-19 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_expenseevent_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='currency',
+            field=models.CharField(default='INR', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='expenseevent',
+            name='currency',
+            field=models.CharField(default='INR', max_length=3),
+        ),
+    ]
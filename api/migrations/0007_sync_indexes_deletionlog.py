@@ -0,0 +1,46 @@
+# Generated by Django 4.2.10 on 2026-10-19 06:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0006_expense_currency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('expense', 'Expense'), ('budget', 'Budget'), ('goal', 'Financial goal')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='budget',
+            index=models.Index(fields=['user', 'updated_at'], name='api_budget_user_id_ebb1cd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'updated_at'], name='api_expense_user_id_9cee15_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='financialgoal',
+            index=models.Index(fields=['user', 'updated_at'], name='api_financi_user_id_5ffbb2_idx'),
+        ),
+        migrations.AddField(
+            model_name='deletionlog',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='deletionlog',
+            index=models.Index(fields=['user', 'deleted_at'], name='api_deletio_user_id_8116b0_idx'),
+        ),
+    ]
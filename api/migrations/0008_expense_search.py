@@ -0,0 +1,92 @@
+from django.db import migrations
+
+# SQLite: FTS5 tables kept in step with api_expense by triggers. The owner
+# column scopes matches to one user inside the index ("u<id>" for the word
+# index, "#<id>#" for the trigram one, so u1 never matches u12). SQLite
+# schema changes that remake api_expense drop these triggers, so such a
+# migration has to recreate them.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE api_expense_fts USING fts5(
+        owner, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    "CREATE VIRTUAL TABLE api_expense_trigram USING fts5(owner, description, tokenize='trigram')",
+    """
+    CREATE TRIGGER api_expense_search_insert AFTER INSERT ON api_expense BEGIN
+        INSERT INTO api_expense_fts(rowid, owner, description)
+        VALUES (new.id, 'u' || new.user_id, new.description);
+        INSERT INTO api_expense_trigram(rowid, owner, description)
+        VALUES (new.id, '#' || new.user_id || '#', new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER api_expense_search_delete AFTER DELETE ON api_expense BEGIN
+        DELETE FROM api_expense_fts WHERE rowid = old.id;
+        DELETE FROM api_expense_trigram WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER api_expense_search_update AFTER UPDATE OF description, user_id ON api_expense BEGIN
+        DELETE FROM api_expense_fts WHERE rowid = old.id;
+        DELETE FROM api_expense_trigram WHERE rowid = old.id;
+        INSERT INTO api_expense_fts(rowid, owner, description)
+        VALUES (new.id, 'u' || new.user_id, new.description);
+        INSERT INTO api_expense_trigram(rowid, owner, description)
+        VALUES (new.id, '#' || new.user_id || '#', new.description);
+    END
+    """,
+    "INSERT INTO api_expense_fts(rowid, owner, description) SELECT id, 'u' || user_id, description FROM api_expense",
+    """
+    INSERT INTO api_expense_trigram(rowid, owner, description)
+    SELECT id, '#' || user_id || '#', description FROM api_expense
+    """,
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS api_expense_search_insert",
+    "DROP TRIGGER IF EXISTS api_expense_search_delete",
+    "DROP TRIGGER IF EXISTS api_expense_search_update",
+    "DROP TABLE IF EXISTS api_expense_fts",
+    "DROP TABLE IF EXISTS api_expense_trigram",
+]
+
+# PostgreSQL: a generated tsvector column needs no triggers; btree_gin lets the
+# GIN index lead with user_id and pg_trgm backs the fuzzy fallback.
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    """
+    ALTER TABLE api_expense ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', coalesce(description, ''))) STORED
+    """,
+    "CREATE INDEX api_expense_search_idx ON api_expense USING GIN (user_id, search_vector)",
+    "CREATE INDEX api_expense_trigram_idx ON api_expense USING GIN (user_id, description gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS api_expense_trigram_idx",
+    "DROP INDEX IF EXISTS api_expense_search_idx",
+    "ALTER TABLE api_expense DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        vendor_statements = statements.get(schema_editor.connection.vendor, [])
+        for statement in vendor_statements:
+            schema_editor.execute(statement)
+
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_sync_indexes_deletionlog'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            run({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 4.2.10 on 2026-10-19 06:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill(apps, schema_editor):
+    Expense = apps.get_model('api', 'Expense')
+    UserSpendingSummary = apps.get_model('api', 'UserSpendingSummary')
+    UserMonthlySpending = apps.get_model('api', 'UserMonthlySpending')
+
+    top = Expense.objects.filter(user_id=OuterRef('user_id'), currency=OuterRef('currency')).order_by('-amount', 'id')
+    UserSpendingSummary.objects.bulk_create(
+        UserSpendingSummary(**row)
+        for row in Expense.objects.values('user_id', 'currency')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .annotate(max_expense_id=Subquery(top.values('id')[:1]), max_amount=Subquery(top.values('amount')[:1]))
+        .order_by()
+    )
+    UserMonthlySpending.objects.bulk_create(
+        (
+            UserMonthlySpending(**row)
+            for row in Expense.objects.annotate(month=TruncMonth('date'))
+            .values('user_id', 'currency', 'month')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0008_expense_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserMonthlySpending',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(default='INR', max_length=3)),
+                ('month', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserSpendingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(default='INR', max_length=3)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('count', models.BigIntegerField(default=0)),
+                ('max_expense_id', models.BigIntegerField(blank=True, null=True)),
+                ('max_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user', 'currency', 'amount'], name='api_expense_user_id_1a3226_idx'),
+        ),
+        migrations.AddField(
+            model_name='userspendingsummary',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spending_summaries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='usermonthlyspending',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_spending', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='userspendingsummary',
+            unique_together={('user', 'currency')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='usermonthlyspending',
+            unique_together={('user', 'currency', 'month')},
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
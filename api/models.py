@@ -1,6 +1,9 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import User
 
+from api.currency import format_money
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='categories')
@@ -15,6 +18,7 @@ class Category(models.Model):
 class Expense(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='expenses')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default='INR')
     description = models.CharField(max_length=255)
     category = models.CharField(max_length=100)
     date = models.DateField()
@@ -23,9 +27,23 @@ class Expense(models.Model):
     
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            # Finds the next largest expense when the current maximum goes away
+            models.Index(fields=['user', 'currency', 'amount']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Values as loaded, so the spending summary can apply only the difference on save
+        instance._loaded = {
+            name: value for name, value in zip(field_names, values) if name in ('amount', 'currency', 'date')
+        }
+        return instance
     
     def __str__(self):
-        return f"{self.description} - ${self.amount}"
+        return f"{self.description} - {format_money(self.amount, self.currency)}"
 
 class Budget(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budgets')
@@ -36,9 +54,10 @@ class Budget(models.Model):
     
     class Meta:
         unique_together = ['user', 'category']
+        indexes = [models.Index(fields=['user', 'updated_at'])]
     
     def __str__(self):
-        return f"{self.category.name} - ₹{self.limit}"
+        return f"{self.category.name} - {format_money(self.limit)}"
 
 class FinancialGoal(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='goals')
@@ -49,5 +68,154 @@ class FinancialGoal(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [models.Index(fields=['user', 'updated_at'])]
+    
+    def __str__(self):
+        return f"{self.name} - {format_money(self.targetAmount)}"
+
+class UserDataVersion(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} - v{self.version}"
+
+class RecurringExpense(models.Model):
+    FREQUENCY_CHOICES = [
+        ('weekly', 'Weekly'),
+        ('biweekly', 'Biweekly'),
+        ('monthly', 'Monthly'),
+        ('quarterly', 'Quarterly'),
+        ('yearly', 'Yearly'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_expenses')
+    description = models.CharField(max_length=255)
+    category = models.CharField(max_length=100)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    frequency = models.CharField(max_length=20, choices=FREQUENCY_CHOICES)
+    period_days = models.PositiveIntegerField()
+    occurrences = models.PositiveIntegerField()
+    last_date = models.DateField()
+    next_date = models.DateField()
+    confidence = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'description']
+        ordering = ['next_date']
+
+    def __str__(self):
+        return f"{self.description} - {format_money(self.amount)} {self.frequency}"
+
+class JobWatermark(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    last_seen = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_seen}"
+
+class ExpenseEvent(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    expense_id = models.BigIntegerField(null=True)
+    category = models.CharField(max_length=100)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3, default='INR')
+    date = models.DateField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.category} {self.date}"
+
+class Notification(models.Model):
+    KIND_CHOICES = [
+        ('budget_threshold', 'Budget threshold'),
+        ('budget_exceeded', 'Budget exceeded'),
+        ('anomaly', 'Unusual expense'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    category = models.CharField(max_length=100)
+    message = models.CharField(max_length=255)
+    # One alert per threshold per month / per expense, enforced by the database
+    dedupe_key = models.CharField(max_length=150)
+    read = models.BooleanField(default=False)
+    emailed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['user', 'dedupe_key']
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.message}"
+
+class DeletionLog(models.Model):
+    MODEL_CHOICES = [
+        ('expense', 'Expense'),
+        ('budget', 'Budget'),
+        ('goal', 'Financial goal'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'deleted_at'])]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.model} {self.object_id}"
+
+class UserSpendingSummary(models.Model):
+    # One row per user and currency, so totals convert at the current rate
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='spending_summaries')
+    currency = models.CharField(max_length=3, default='INR')
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    count = models.BigIntegerField(default=0)
+    max_expense_id = models.BigIntegerField(null=True, blank=True)
+    max_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['user', 'currency']
+
+    def __str__(self):
+        return f"{self.user_id} - {format_money(self.total, self.currency)} over {self.count}"
+
+class UserMonthlySpending(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_spending')
+    currency = models.CharField(max_length=3, default='INR')
+    month = models.DateField()
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'currency', 'month']
+        ordering = ['month']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.month:%Y-%m} {format_money(self.total, self.currency)}"
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    # SHA-256 of the client's key and of method + path + body, so rows stay fixed-size
+    key = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=64)
+    # Null until the first request finishes
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ['user', 'key']
+
     def __str__(self):
-        return f"{self.name} - ₹{self.targetAmount}"
\ No newline at end of file
+        return f"{self.user_id} - {self.key[:12]} ({self.status_code or 'pending'})"
@@ -0,0 +1,182 @@
+"""Sampled per-endpoint request profiling (wall time, SQL, render time, bytes)"""
+import bisect
+import random
+import threading
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+TIME_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def profiling_settings():
+    config = {"ENABLED": False, "SAMPLE_RATE": 1.0, "SERVER_TIMING": True}
+    config.update(getattr(settings, "API_PROFILING", {}))
+    return config
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and max"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile"""
+        if not self.count:
+            return 0
+        rank = q / 100 * self.count
+        seen = 0
+        for idx, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.buckets[idx], self.max) if idx < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": round(self.max, 3),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class ProfileRegistry:
+    """Thread-safe, in-process aggregation of sampled request profiles"""
+
+    metrics = {
+        "wall_ms": TIME_BUCKETS_MS,
+        "db_ms": TIME_BUCKETS_MS,
+        "db_queries": COUNT_BUCKETS,
+        "render_ms": TIME_BUCKETS_MS,
+        "response_bytes": BYTE_BUCKETS,
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, sample):
+        with self._lock:
+            histograms = self._endpoints.get(endpoint)
+            if histograms is None:
+                histograms = {
+                    name: Histogram(buckets) for name, buckets in self.metrics.items()
+                }
+                self._endpoints[endpoint] = histograms
+            for name, value in sample.items():
+                if value is not None:
+                    histograms[name].observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: {name: hist.snapshot() for name, hist in histograms.items()}
+                for endpoint, histograms in sorted(self._endpoints.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+registry = ProfileRegistry()
+
+
+class QueryTimer:
+    """``connection.execute_wrapper`` hook counting and timing SQL"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += perf_counter() - start
+
+
+def endpoint_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "unresolved"
+
+
+class ProfilingMiddleware:
+    """Opt-in middleware profiling a sample of requests
+
+    Enabled through ``settings.API_PROFILING``; sampled requests get a
+    ``Server-Timing`` header and are aggregated into ``profiling.registry``.
+    """
+
+    def __init__(self, get_response):
+        config = profiling_settings()
+        if not config["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = float(config["SAMPLE_RATE"])
+        self.server_timing = config["SERVER_TIMING"]
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        request._profile_render = [None, 0.0]
+        start = perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        wall = (perf_counter() - start) * 1000
+
+        render = request._profile_render[1] * 1000
+        sample = {
+            "wall_ms": wall,
+            "db_ms": timer.duration * 1000,
+            "db_queries": timer.count,
+            "render_ms": render,
+            "response_bytes": None if response.streaming else len(response.content),
+        }
+        registry.record(endpoint_name(request), sample)
+
+        if self.server_timing:
+            response["Server-Timing"] = ", ".join(
+                [
+                    f"total;dur={wall:.1f}",
+                    f'db;dur={sample["db_ms"]:.1f};desc="{timer.count} queries"',
+                    f"render;dur={render:.1f}",
+                    f"app;dur={max(wall - sample['db_ms'] - render, 0):.1f}",
+                ]
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns
+        state = getattr(request, "_profile_render", None)
+        if state is not None:
+            state[0] = perf_counter()
+
+            def finish(rendered):
+                state[1] += perf_counter() - state[0]
+
+            response.add_post_render_callback(finish)
+        return response
@@ -0,0 +1,230 @@
+"""Recurring expense (subscription, rent, bills) detection
+
+Expenses are grouped per user on a normalized description; a group is
+recurring when its gaps are regular, match a known period and its amounts stay
+within tolerance. Detection is vectorized over all groups at once and runs
+incrementally per user: only users with expenses written or deleted since the
+last run are re-scanned. Within such a user every group is re-detected from
+all of their expenses, since one new or removed expense moves its group's
+median gap and amount, and a deleted expense's description is no longer known.
+"""
+import re
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api import currency
+from api.analytics import grouped_stats
+from api.models import DeletionLog, Expense, JobWatermark, RecurringExpense
+from api.versioning import bump_data_version
+
+WATERMARK = "recurring-expenses"
+# Rows committed slightly out of updated_at order are caught on the next run
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+PERIODS = {"weekly": 7, "biweekly": 14, "monthly": 30, "quarterly": 91, "yearly": 365}
+PER_MONTH = {"weekly": 52 / 12, "biweekly": 26 / 12, "monthly": 1, "quarterly": 1 / 3, "yearly": 1 / 12}
+MIN_OCCURRENCES = 3
+INTERVAL_TOLERANCE = 0.2
+AMOUNT_TOLERANCE = 0.15
+MIN_REGULARITY = 0.7
+
+_NOISE_RE = re.compile(r"[^a-z ]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_description(description):
+    """Lowercase, drop digits/punctuation and collapse whitespace"""
+    return _SPACE_RE.sub(" ", _NOISE_RE.sub(" ", description.lower())).strip()
+
+
+def detect(groups, days, amounts):
+    """Classify every group at once
+
+    ``groups`` are int codes, ``days`` date ordinals and ``amounts`` floats.
+    Returns a dict of per-group arrays; ``recurring`` marks the hits.
+    """
+    n_groups = int(groups.max()) + 1
+    order = np.lexsort((days, groups))
+    groups, days, amounts = groups[order], days[order], amounts[order]
+
+    counts = np.bincount(groups, minlength=n_groups)
+    last_index = np.cumsum(counts) - 1
+    amount_stats = grouped_stats(groups, amounts, n_groups)
+    typical_amount = amount_stats["p50"]
+    close_amounts = np.abs(amounts - typical_amount[groups]) <= AMOUNT_TOLERANCE * typical_amount[groups]
+    amount_consistency = np.bincount(groups, weights=close_amounts, minlength=n_groups) / np.maximum(counts, 1)
+
+    # Gaps between consecutive expenses of the same group; same-day repeats are ignored
+    same_group = groups[1:] == groups[:-1]
+    gaps = np.diff(days)
+    keep = same_group & (gaps > 0)
+    gap_groups = groups[1:][keep]
+    gaps = gaps[keep].astype(np.float64)
+
+    median_gap = np.zeros(n_groups)
+    regularity = np.zeros(n_groups)
+    if len(gaps):
+        gap_count = np.bincount(gap_groups, minlength=n_groups)
+        median_gap = grouped_stats(gap_groups, gaps, n_groups)["p50"]
+        tolerance = np.maximum(3, INTERVAL_TOLERANCE * median_gap)
+        regular = np.abs(gaps - median_gap[gap_groups]) <= tolerance[gap_groups]
+        regularity = np.bincount(gap_groups, weights=regular, minlength=n_groups) / np.maximum(gap_count, 1)
+
+    period_days = np.array(list(PERIODS.values()), dtype=np.float64)
+    distance = np.abs(median_gap[:, None] - period_days[None, :])
+    nearest = np.argmin(distance, axis=1)
+    period_match = distance[np.arange(n_groups), nearest] <= np.maximum(3, 0.25 * period_days[nearest])
+
+    recurring = (
+        (counts >= MIN_OCCURRENCES)
+        & (regularity >= MIN_REGULARITY)
+        & (amount_consistency >= MIN_REGULARITY)
+        & period_match
+    )
+    return {
+        "recurring": recurring,
+        "frequency": np.array(list(PERIODS))[nearest],
+        "period_days": np.rint(median_gap).astype(np.int64),
+        "occurrences": counts,
+        "amount": typical_amount,
+        "last_day": days[np.clip(last_index, 0, None)],
+        "confidence": regularity * amount_consistency,
+    }
+
+
+def _load(expenses):
+    """Fetch expenses and encode (user, normalized description) groups"""
+    rows = list(
+        expenses.order_by().values_list("user_id", "description", "category", "date", "amount", "currency")
+    )
+    if not rows:
+        return None
+
+    user_ids, descriptions, categories, dates, amounts, currencies = zip(*rows)
+    currency_codes, currency_index = np.unique(np.array(currencies, dtype=object), return_inverse=True)
+    normalized = {text: normalize_description(text) for text in set(descriptions)}
+    keys = np.array(
+        [f"{user_id}\x00{normalized[text]}" for user_id, text in zip(user_ids, descriptions)], dtype=object
+    )
+    labels, groups = np.unique(keys, return_inverse=True)
+    return {
+        "labels": labels,
+        "groups": groups.astype(np.int64),
+        "categories": np.array(categories, dtype=object),
+        "days": np.fromiter((d.toordinal() for d in dates), np.int32, len(dates)),
+        "amounts": np.array(amounts, dtype=np.float64) * currency.factors(currency_codes)[currency_index],
+    }
+
+
+def _detect_rows(expenses):
+    """Unsaved ``RecurringExpense`` rows for every recurring group in ``expenses``"""
+    data = _load(expenses)
+    if data is None:
+        return []
+
+    result = detect(data["groups"], data["days"], data["amounts"])
+    # Category of each group's most recent expense
+    order = np.lexsort((data["days"], data["groups"]))
+    last_rows = order[np.cumsum(np.bincount(data["groups"])) - 1]
+    found = []
+    for code in np.flatnonzero(result["recurring"]):
+        user_id, _, key = data["labels"][code].partition("\x00")
+        last_date = date.fromordinal(int(result["last_day"][code]))
+        period = int(result["period_days"][code])
+        found.append(
+            RecurringExpense(
+                user_id=int(user_id),
+                description=key[:255],
+                category=data["categories"][last_rows[code]],
+                amount=Decimal(f"{result['amount'][code]:.2f}"),
+                frequency=result["frequency"][code],
+                period_days=period,
+                occurrences=int(result["occurrences"][code]),
+                last_date=last_date,
+                next_date=last_date + timedelta(days=period),
+                confidence=round(float(result["confidence"][code]), 3),
+            )
+        )
+    return found
+
+
+def _signature(row):
+    return (
+        row.description, row.category, row.amount, row.frequency,
+        row.period_days, row.occurrences, row.last_date, row.confidence,
+    )
+
+
+def run_detection(full=False):
+    """Re-detect recurring expenses for users whose expenses changed since the last run
+
+    Changes are found through ``Expense.updated_at`` and the expense
+    tombstones in ``DeletionLog``, so profile, budget or goal edits (which
+    also bump the data version) don't trigger a re-scan. Returns
+    ``(users_processed, users_changed)``.
+    """
+    started = timezone.now()
+    watermark, _ = JobWatermark.objects.get_or_create(name=WATERMARK)
+
+    # Past the tombstone retention, deletes since the last run may be gone
+    retention = timedelta(days=settings.SYNC["TOMBSTONE_RETENTION_DAYS"])
+    if full or watermark.last_seen is None or watermark.last_seen < started - retention:
+        user_ids = set(Expense.objects.order_by().values_list("user_id", flat=True).distinct())
+        user_ids |= set(RecurringExpense.objects.order_by().values_list("user_id", flat=True).distinct())
+    else:
+        since = watermark.last_seen - WATERMARK_OVERLAP
+        user_ids = set(
+            Expense.objects.filter(updated_at__gte=since).order_by().values_list("user_id", flat=True).distinct()
+        )
+        user_ids |= set(
+            DeletionLog.objects.filter(model="expense", deleted_at__gte=since)
+            .order_by().values_list("user_id", flat=True).distinct()
+        )
+
+    found = _detect_rows(Expense.objects.filter(user_id__in=user_ids)) if user_ids else []
+    by_user = {}
+    for row in found:
+        by_user.setdefault(row.user_id, []).append(row)
+    existing = {}
+    for row in RecurringExpense.objects.filter(user_id__in=user_ids):
+        existing.setdefault(row.user_id, []).append(row)
+
+    # Only users whose detections differ are rewritten, so re-runs inside the
+    # overlap window don't bump versions (and invalidate caches) for nothing
+    changed = [
+        user_id for user_id in user_ids
+        if sorted(map(_signature, by_user.get(user_id, []))) != sorted(map(_signature, existing.get(user_id, [])))
+    ]
+    with transaction.atomic():
+        RecurringExpense.objects.filter(user_id__in=changed).delete()
+        RecurringExpense.objects.bulk_create(
+            [row for user_id in changed for row in by_user.get(user_id, [])], batch_size=1000
+        )
+        for user_id in changed:
+            bump_data_version(user_id)
+        watermark.last_seen = started
+        watermark.save(update_fields=["last_seen", "updated_at"])
+    return len(user_ids), len(changed)
+
+
+def active_recurring(user):
+    """Detected recurring expenses that haven't missed more than one cycle"""
+    today = timezone.now().date()
+    return [
+        item for item in RecurringExpense.objects.filter(user=user)
+        if item.next_date + timedelta(days=item.period_days) >= today
+    ]
+
+
+def monthly_commitments(items):
+    """``{category: expected monthly spend}`` for the given recurring expenses"""
+    commitments = {}
+    for item in items:
+        monthly = float(item.amount) * PER_MONTH[item.frequency]
+        commitments[item.category] = commitments.get(item.category, 0) + monthly
+    return commitments
@@ -0,0 +1,187 @@
+"""Full-text search over expense descriptions
+
+Uses the database's own index: SQLite FTS5 tables or a PostgreSQL tsvector
+column (see migration 0008), both maintained by the database on every write.
+The index returns the newest ``CANDIDATES`` word-prefix matches, which are
+ranked here (exact words over prefixes, shorter descriptions first). When they
+don't fill the page, trigram word similarity adds typo-tolerant matches.
+On SQLite the FTS5 index is walked newest-first (``ORDER BY rowid DESC``)
+and stops after ``CANDIDATES`` rows. On PostgreSQL the GIN index only finds
+the matching rows: they are all fetched and sorted by id before the limit, so
+a common term costs in proportion to the user's matches.
+"""
+import html
+import re
+
+from django.db import connection
+
+from api.models import Expense
+
+SIMILARITY_THRESHOLD = 0.5
+CANDIDATES = 200
+MAX_TERMS = 8
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def terms(query):
+    """Lowercased words of two or more characters, at most ``MAX_TERMS``"""
+    return [word for word in _WORD_RE.findall(query.lower()) if len(word) > 1][:MAX_TERMS]
+
+
+def rank(words, description):
+    """Exact word hits count double a prefix hit; longer descriptions are diluted"""
+    description_words = [word.lower() for word in _WORD_RE.findall(description)]
+    hits = sum(
+        2 if word in description_words else 1
+        for word in words
+        if any(candidate.startswith(word) for candidate in description_words)
+    )
+    return hits / len(description_words) ** 0.5 if description_words else 0.0
+
+
+def trigrams(word):
+    """pg_trgm-style trigrams of one word: two leading blanks, one trailing"""
+    padded = f"  {word.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def word_similarity(words, description):
+    """Mean over query words of their best trigram Jaccard score against a description word"""
+    candidates = [trigrams(word) for word in _WORD_RE.findall(description)]
+    if not words or not candidates:
+        return 0.0
+    total = 0.0
+    for word in words:
+        grams = trigrams(word)
+        total += max(len(grams & other) / len(grams | other) for other in candidates)
+    return total / len(words)
+
+
+def highlight(description, matches):
+    """HTML-escaped description with the words ``matches(word)`` accepts in <mark>"""
+    pieces = []
+    last = 0
+    for found in _WORD_RE.finditer(description):
+        word = found.group(0)
+        pieces.append(html.escape(description[last:found.start()]))
+        pieces.append(f"<mark>{html.escape(word)}</mark>" if matches(word.lower()) else html.escape(word))
+        last = found.end()
+    pieces.append(html.escape(description[last:]))
+    return "".join(pieces)
+
+
+def _sqlite_prefix(user_id, words):
+    match = f'owner:"u{user_id}" AND description:(' + " AND ".join(f'"{word}"*' for word in words) + ")"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT rowid, description FROM api_expense_fts
+            WHERE api_expense_fts MATCH %s
+            ORDER BY rowid DESC
+            LIMIT %s
+            """,
+            [match, CANDIDATES],
+        )
+        return cursor.fetchall()
+
+
+def _sqlite_fuzzy(user_id, words):
+    # The trigram tokenizer ignores the padding, so only whole 3-letter grams are usable
+    grams = sorted({gram for word in words for gram in trigrams(word) if " " not in gram})
+    if not grams:
+        return []
+    match = f'owner:"#{user_id}#" AND description:(' + " OR ".join(f'"{gram}"' for gram in grams) + ")"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT rowid, description FROM api_expense_trigram
+            WHERE api_expense_trigram MATCH %s
+            ORDER BY rowid DESC
+            LIMIT %s
+            """,
+            [match, CANDIDATES],
+        )
+        return cursor.fetchall()
+
+
+def _postgres_prefix(user_id, words):
+    tsquery = " & ".join(f"{word}:*" for word in words)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT id, description FROM api_expense
+            WHERE user_id = %s AND search_vector @@ to_tsquery('simple', %s)
+            ORDER BY id DESC
+            LIMIT %s
+            """,
+            [user_id, tsquery, CANDIDATES],
+        )
+        return cursor.fetchall()
+
+
+def _postgres_fuzzy(user_id, words):
+    text = " ".join(words)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT id, description FROM api_expense
+            WHERE user_id = %s AND %s <%% description
+            ORDER BY id DESC
+            LIMIT %s
+            """,
+            [user_id, text, CANDIDATES],
+        )
+        return cursor.fetchall()
+
+
+def _icontains_prefix(user_id, words):
+    # Other databases have no search index; same results, found by scanning
+    expenses = Expense.objects.filter(user_id=user_id)
+    for word in words:
+        expenses = expenses.filter(description__icontains=word)
+    return list(expenses.order_by("-id").values_list("id", "description")[:CANDIDATES])
+
+
+BACKENDS = {
+    "sqlite": (_sqlite_prefix, _sqlite_fuzzy),
+    "postgresql": (_postgres_prefix, _postgres_fuzzy),
+}
+
+
+def search_expenses(user, query, limit=20, fuzzy=True):
+    """Ranked ``[(expense_id, snippet_html, score, match)]`` for the user's expenses"""
+    words = terms(query)
+    if not words:
+        return []
+
+    prefix, fuzzy_candidates = BACKENDS.get(connection.vendor, (_icontains_prefix, None))
+    ranked = sorted(
+        ((pk, description, rank(words, description)) for pk, description in prefix(user.pk, words)),
+        key=lambda row: row[2],
+        reverse=True,
+    )
+    results = [
+        (pk, highlight(description, lambda word: any(word.startswith(term) for term in words)), score, "prefix")
+        for pk, description, score in ranked[:limit]
+    ]
+
+    if fuzzy and fuzzy_candidates is not None and len(results) < limit:
+        seen = {pk for pk, *_ in results}
+        scored = [
+            (pk, description, word_similarity(words, description))
+            for pk, description in fuzzy_candidates(user.pk, words)
+            if pk not in seen
+        ]
+        scored = sorted(
+            (row for row in scored if row[2] >= SIMILARITY_THRESHOLD), key=lambda row: row[2], reverse=True
+        )
+        results += [
+            (
+                pk,
+                highlight(description, lambda word: word_similarity([word], " ".join(words)) >= SIMILARITY_THRESHOLD),
+                score,
+                "fuzzy",
+            )
+            for pk, description, score in scored[: limit - len(results)]
+        ]
+    return results
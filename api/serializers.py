@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Expense, Category ,Budget, FinancialGoal
+from .currency import supported_currencies
+from .models import Expense, Category ,Budget, FinancialGoal, Notification
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -20,7 +21,13 @@ class CategorySerializer(serializers.ModelSerializer):
 class ExpenseSerializer(serializers.ModelSerializer):
     class Meta:
         model = Expense
-        fields = ['id', 'amount', 'description', 'category', 'date']
+        fields = ['id', 'amount', 'currency', 'description', 'category', 'date']
+    
+    def validate_currency(self, value):
+        value = value.upper()
+        if value not in supported_currencies():
+            raise serializers.ValidationError(f"Unsupported currency. Choose one of: {', '.join(supported_currencies())}")
+        return value
     
     def create(self, validated_data):
         user = self.context['request'].user
@@ -68,4 +75,10 @@ class FinancialGoalSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context['request'].user
         validated_data['user'] = user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'kind', 'category', 'message', 'read', 'created_at']
+        read_only_fields = fields
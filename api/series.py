@@ -0,0 +1,181 @@
+"""Dense, calendar-correct time series shared by forecasting, trends and charts"""
+from datetime import date, timedelta
+
+import numpy as np
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek, TruncYear
+
+from api.currency import converted_amount
+from api.models import Expense
+
+
+def month_key(day):
+    """``year * 12 + month - 1``, so consecutive months differ by one"""
+    return day.year * 12 + day.month - 1
+
+
+def key_to_date(key):
+    """First day of the month identified by ``key``"""
+    return date(key // 12, key % 12 + 1, 1)
+
+
+class MonthlySeries:
+    """Zero-filled ``(category x month)`` totals in the display currency"""
+
+    def __init__(self, categories, first_month, values):
+        self.categories = categories
+        self.first_month = first_month
+        self.values = values
+
+    def __len__(self):
+        return self.values.shape[1]
+
+    @property
+    def last_month(self):
+        return self.first_month + len(self) - 1
+
+    @property
+    def months(self):
+        return [key_to_date(self.first_month + i) for i in range(len(self))]
+
+    def labels(self, fmt="%Y-%m"):
+        return [month.strftime(fmt) for month in self.months]
+
+    def totals(self):
+        """Monthly totals across all categories"""
+        return self.values.sum(axis=0)
+
+    def row(self, category):
+        """One category's monthly totals (zeros if it has no expenses)"""
+        if category not in self.categories:
+            return np.zeros(len(self))
+        return self.values[self.categories.index(category)]
+
+
+def densify(categories, codes, month_keys, amounts, first_month, last_month):
+    """Scatter (category code, month key, amount) rows into a dense series
+
+    Rows outside ``[first_month, last_month]`` are dropped; months without
+    rows are zero.
+    """
+    n_months = max(last_month - first_month + 1, 0)
+    inside = (month_keys >= first_month) & (month_keys <= last_month)
+    flat = codes[inside].astype(np.int64) * n_months + (month_keys[inside] - first_month)
+    values = np.bincount(
+        flat, weights=amounts[inside], minlength=len(categories) * n_months
+    ).reshape(len(categories), n_months)
+    return MonthlySeries(categories, first_month, values)
+
+
+def monthly_series(user, start=None, end=None):
+    """Monthly totals per category for ``start <= date <= end`` from one grouped query
+
+    Without bounds the range spans the user's first to last month with expenses.
+    """
+    expenses = Expense.objects.filter(user=user)
+    if start is not None:
+        expenses = expenses.filter(date__gte=start)
+    if end is not None:
+        expenses = expenses.filter(date__lte=end)
+
+    rows = list(
+        expenses.order_by()
+        .annotate(month=TruncMonth("date"))
+        .values_list("category", "month")
+        .annotate(total=Sum(converted_amount()))
+    )
+    if not rows and (start is None or end is None):
+        return MonthlySeries([], 0, np.zeros((0, 0)))
+
+    categories, months, totals = zip(*rows) if rows else ((), (), ())
+    names, codes = np.unique(np.array(categories, dtype=object), return_inverse=True)
+    keys = np.fromiter((month_key(month) for month in months), np.int64, len(months))
+    first = month_key(start) if start is not None else int(keys.min())
+    last = month_key(end) if end is not None else int(keys.max())
+    return densify(
+        [str(name) for name in names],
+        codes,
+        keys,
+        np.array(totals, dtype=np.float64),
+        first,
+        last,
+    )
+
+
+BUCKETS = ("day", "week", "month", "year")
+TRUNCATORS = {"day": TruncDay, "week": TruncWeek, "month": TruncMonth, "year": TruncYear}
+
+
+def bucket_start(day, bucket):
+    """Start of the bucket containing ``day`` (weeks start on Monday, like TruncWeek)"""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    if bucket == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def bucket_index(day, first, bucket):
+    """Offset of ``day``'s bucket from the bucket starting at ``first``"""
+    if bucket == "day":
+        return (day - first).days
+    if bucket == "week":
+        return (day - first).days // 7
+    if bucket == "month":
+        return month_key(day) - month_key(first)
+    return day.year - first.year
+
+
+def bucket_starts(start, end, bucket):
+    """Every bucket start from ``start``'s bucket through ``end``'s"""
+    first = bucket_start(start, bucket)
+    count = bucket_index(bucket_start(end, bucket), first, bucket) + 1
+    if bucket == "day":
+        return [first + timedelta(days=i) for i in range(count)]
+    if bucket == "week":
+        return [first + timedelta(weeks=i) for i in range(count)]
+    if bucket == "month":
+        return [key_to_date(month_key(first) + i) for i in range(count)]
+    return [date(first.year + i, 1, 1) for i in range(count)]
+
+
+def coarsest_needed(start, end, bucket, max_points):
+    """The finest bucket at least as coarse as ``bucket`` with <= max_points buckets
+
+    ``None`` when even yearly buckets would be too many.
+    """
+    for candidate in BUCKETS[BUCKETS.index(bucket):]:
+        first = bucket_start(start, candidate)
+        if bucket_index(bucket_start(end, candidate), first, candidate) + 1 <= max_points:
+            return candidate
+    return None
+
+
+def bucketed_series(user, bucket, start, end, categories=None):
+    """Zero-filled per-category totals bucketed in the database
+
+    Returns ``(bucket_starts, category_names, values)`` where ``values`` is a
+    ``(category x bucket)`` array in the display currency.
+    """
+    expenses = Expense.objects.filter(user=user, date__gte=start, date__lte=end)
+    if categories:
+        expenses = expenses.filter(category__in=categories)
+
+    rows = list(
+        expenses.order_by()
+        .annotate(period=TRUNCATORS[bucket]("date"))
+        .values_list("category", "period")
+        .annotate(total=Sum(converted_amount()))
+    )
+    starts = bucket_starts(start, end, bucket)
+    names = sorted({category for category, _, _ in rows})
+    values = np.zeros((len(names), len(starts)))
+    if rows:
+        first = starts[0]
+        codes = {name: code for code, name in enumerate(names)}
+        for category, period, total in rows:
+            period = period.date() if hasattr(period, "date") else period
+            values[codes[category], bucket_index(period, first, bucket)] += float(total)
+    return starts, names, values
@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api import alerts, summary, sync
+from api.models import Budget, Category, Expense, FinancialGoal
+from api.versioning import bump_data_version
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=FinancialGoal)
+@receiver(post_delete, sender=FinancialGoal)
+def bump_user_data_version(sender, instance, **kwargs):
+    """Invalidate the owner's cached responses on every write"""
+    if _deleting_user(kwargs):
+        # The whole account is being deleted, its version row goes with it
+        return
+    bump_data_version(instance.user_id)
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def enqueue_expense_event(sender, instance, **kwargs):
+    """Hand the write to the alerts worker"""
+    if _deleting_user(kwargs):
+        return
+    alerts.enqueue(instance, deleted="created" not in kwargs)
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def update_spending_summary(sender, instance, **kwargs):
+    """Keep the per-user totals and maximum in step with the expense"""
+    if _deleting_user(kwargs):
+        return
+    if "created" in kwargs:
+        summary.record_save(instance, kwargs["created"])
+    else:
+        summary.record_delete(instance)
+
+
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Budget)
+@receiver(post_delete, sender=FinancialGoal)
+def record_tombstone(sender, instance, **kwargs):
+    """Let delta-sync clients learn about the deletion"""
+    if _deleting_user(kwargs):
+        return
+    sync.log_deletion(instance)
+
+
+@receiver(post_save, sender=Category)
+def resync_category_budgets(sender, instance, created, **kwargs):
+    """Budgets serialize the category name, so a rename must reach delta sync"""
+    if not created:
+        sync.touch_category_budgets(instance)
+
+
+def _deleting_user(kwargs):
+    origin = kwargs.get("origin")
+    return isinstance(origin, User) or getattr(origin, "model", None) is User
@@ -0,0 +1,230 @@
+"""Per-user spending counters: lifetime totals, the largest expense and monthly totals
+
+Maintained with ``F()`` updates from the expense signals, so reading a total or
+the highest expense is a primary-key lookup instead of a scan over every
+expense. Rows are kept per currency and converted when read, which keeps them
+correct when the FX table changes. Writes that bypass signals (``bulk_create``,
+``QuerySet.update``, raw SQL) leave them stale until ``repair_spending_summary``
+runs.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+from api.currency import convert, display_currency
+from api.models import Expense, UserMonthlySpending, UserSpendingSummary
+
+
+def _add(model, amount, count, new_max=None, **key):
+    # Same update-then-create dance as the data version, safe under concurrent writers
+    changes = {"total": F("total") + amount, "count": F("count") + count}
+    defaults = {"total": amount, "count": count}
+    if new_max is not None:
+        # Folded into the totals UPDATE, so a new maximum costs no extra query
+        expense_id, max_amount = new_max
+        # Ties go to the oldest expense (lowest id), as in _reset_max and rebuild
+        raised = (
+            Q(max_amount__isnull=True)
+            | Q(max_amount__lt=max_amount)
+            | Q(max_amount=max_amount, max_expense_id__gt=expense_id)
+        )
+        for field, value in (("max_amount", max_amount), ("max_expense_id", expense_id)):
+            output_field = model._meta.get_field(field)
+            changes[field] = Case(
+                When(raised, then=Value(value, output_field=output_field)), default=F(field), output_field=output_field
+            )
+        defaults.update(max_amount=max_amount, max_expense_id=expense_id)
+
+    if model.objects.filter(**key).update(**changes):
+        return
+    _, created = model.objects.get_or_create(**key, defaults=defaults)
+    if not created:
+        model.objects.filter(**key).update(**changes)
+
+
+def _reset_max(user_id, currency):
+    top = (
+        Expense.objects.filter(user_id=user_id, currency=currency)
+        .order_by("-amount", "id")
+        .values_list("id", "amount")
+        .first()
+    )
+    expense_id, amount = top or (None, None)
+    UserSpendingSummary.objects.filter(user_id=user_id, currency=currency).update(
+        max_expense_id=expense_id, max_amount=amount
+    )
+
+
+def _key(expense):
+    # Values may still be strings when assigned directly (create(date="2024-01-31"))
+    date = Expense._meta.get_field("date").to_python(expense["date"])
+    return expense["currency"], date.replace(day=1), Expense._meta.get_field("amount").to_python(expense["amount"])
+
+
+def _apply(user_id, currency, month, amount, count, new_max=None):
+    _add(UserSpendingSummary, amount, count, new_max, user_id=user_id, currency=currency)
+    _add(UserMonthlySpending, amount, count, user_id=user_id, currency=currency, month=month)
+
+
+def record_save(expense, created):
+    """Fold a created or edited expense into its owner's counters"""
+    old = None if created else getattr(expense, "_loaded", None)
+    if not created and (old is None or len(old) < 3):
+        # Saved without being loaded first: no baseline to diff against
+        rebuild([expense.user_id])
+        return
+
+    new = _key(vars(expense))
+    if old is not None:
+        old = _key(old)
+        if old == new:
+            return
+        _apply(expense.user_id, old[0], old[1], -old[2], -1)
+    _apply(expense.user_id, *new, 1, new_max=(expense.pk, new[2]))
+
+    if old is not None and (old[0] != new[0] or new[2] < old[2]):
+        # It may have been the maximum of its old currency, or lost that spot
+        _reset_max(expense.user_id, old[0])
+    # Baseline for the next save of this same instance (only the month matters)
+    expense._loaded = dict(zip(("currency", "date", "amount"), new))
+
+
+def record_delete(expense):
+    """Take a deleted expense out of its owner's counters"""
+    currency, month, amount = _key(vars(expense))
+    _apply(expense.user_id, currency, month, -amount, -1)
+    if UserSpendingSummary.objects.filter(
+        user_id=expense.user_id, currency=expense.currency, max_expense_id=expense.pk
+    ).exists():
+        _reset_max(expense.user_id, expense.currency)
+
+
+def lifetime(user):
+    """(total in the display currency, number of expenses)"""
+    rows = UserSpendingSummary.objects.filter(user=user).values_list("currency", "total", "count")
+    total, count = Decimal("0.00"), 0
+    for currency, amount, rows_count in rows:
+        total += convert(amount, currency)
+        count += rows_count
+    return total, count
+
+
+def month_total(user, start, end=None):
+    """Spending in the display currency for whole months from ``start`` up to ``end`` (exclusive)"""
+    months = UserMonthlySpending.objects.filter(user=user, month__gte=start.replace(day=1))
+    if end is not None:
+        months = months.filter(month__lt=end)
+    rows = months.values("currency").annotate(total=Sum("total")).values_list("currency", "total")
+    return sum((convert(amount, currency) for currency, amount in rows), Decimal("0.00"))
+
+
+def highest_expense(user):
+    """The user's largest expense after currency conversion, or ``None``
+
+    Falls back to the ``(user, currency, amount)`` index when the counters have
+    no maximum or point at a deleted row, i.e. after writes that bypassed signals.
+    """
+    rows = UserSpendingSummary.objects.filter(user=user, max_expense_id__isnull=False).values_list(
+        "currency", "max_amount", "max_expense_id"
+    )
+    to = display_currency()
+    if rows:
+        _, _, expense_id = max(rows, key=lambda row: convert(row[1], row[0], to))
+        expense = Expense.objects.filter(pk=expense_id).first()
+        if expense is not None:
+            return expense
+
+    expenses = Expense.objects.filter(user=user)
+    candidates = [
+        expenses.filter(currency=currency).order_by("-amount", "id").first()
+        for currency in expenses.order_by().values_list("currency", flat=True).distinct()
+    ]
+    return max(
+        (expense for expense in candidates if expense is not None),
+        key=lambda expense: convert(expense.amount, expense.currency, to),
+        default=None,
+    )
+
+
+def _cents(value):
+    # SQLite sums decimals as floats
+    return Decimal(value).quantize(Decimal("0.01"))
+
+
+def rebuild(user_ids=None):
+    """Recompute counters from the expenses table; returns the ids of users that had drifted"""
+    expenses = Expense.objects.all()
+    summaries = UserSpendingSummary.objects.all()
+    months = UserMonthlySpending.objects.all()
+    if user_ids is not None:
+        expenses = expenses.filter(user_id__in=user_ids)
+        summaries = summaries.filter(user_id__in=user_ids)
+        months = months.filter(user_id__in=user_ids)
+
+    # Ties go to the oldest expense (lowest id), like _add and _reset_max
+    top = Expense.objects.filter(user_id=OuterRef("user_id"), currency=OuterRef("currency")).order_by(
+        "-amount", "id"
+    )
+    expected = defaultdict(dict)
+    for row in (
+        expenses.values("user_id", "currency")
+        .annotate(total=Sum("amount"), count=Count("id"))
+        .annotate(max_expense_id=Subquery(top.values("id")[:1]), max_amount=Subquery(top.values("amount")[:1]))
+        .order_by()
+    ):
+        expected[row["user_id"]][row["currency"]] = (
+            _cents(row["total"]),
+            row["count"],
+            row["max_expense_id"],
+            row["max_amount"],
+        )
+    expected_months = defaultdict(dict)
+    for row in (
+        expenses.annotate(month=TruncMonth("date"))
+        .values("user_id", "currency", "month")
+        .annotate(total=Sum("amount"), count=Count("id"))
+        .order_by()
+    ):
+        expected_months[row["user_id"]][(row["currency"], row["month"])] = (_cents(row["total"]), row["count"])
+
+    # Rows emptied by deletions are harmless leftovers, not drift
+    actual = defaultdict(dict)
+    for user_id, currency, *row in summaries.exclude(count=0, total=0).values_list(
+        "user_id", "currency", "total", "count", "max_expense_id", "max_amount"
+    ):
+        actual[user_id][currency] = tuple(row)
+    actual_months = defaultdict(dict)
+    for user_id, currency, month, *row in months.exclude(count=0, total=0).values_list(
+        "user_id", "currency", "month", "total", "count"
+    ):
+        actual_months[user_id][(currency, month)] = tuple(row)
+
+    drifted = sorted(
+        user_id
+        for user_id in set(expected) | set(actual) | set(expected_months) | set(actual_months)
+        if expected.get(user_id, {}) != actual.get(user_id, {})
+        or expected_months.get(user_id, {}) != actual_months.get(user_id, {})
+    )
+    for user_id in drifted:
+        with transaction.atomic():
+            UserSpendingSummary.objects.filter(user_id=user_id).delete()
+            UserMonthlySpending.objects.filter(user_id=user_id).delete()
+            UserSpendingSummary.objects.bulk_create(
+                UserSpendingSummary(
+                    user_id=user_id,
+                    currency=currency,
+                    total=total,
+                    count=count,
+                    max_expense_id=expense_id,
+                    max_amount=max_amount,
+                )
+                for currency, (total, count, expense_id, max_amount) in expected.get(user_id, {}).items()
+            )
+            UserMonthlySpending.objects.bulk_create(
+                UserMonthlySpending(user_id=user_id, currency=currency, month=month, total=total, count=count)
+                for (currency, month), (total, count) in expected_months.get(user_id, {}).items()
+            )
+    return drifted
@@ -0,0 +1,85 @@
+"""Delta sync for offline and mobile clients
+
+A cursor is the server clock (microseconds since the epoch) read before the
+change queries ran. The next sync returns rows whose ``updated_at`` is at or
+after the cursor, minus a small overlap for transactions that committed late,
+plus tombstones from ``DeletionLog``. Clients upsert by id, so the overlap
+only ever repeats rows, it never loses them.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from api.models import Budget, DeletionLog, Expense, FinancialGoal
+from api.serializers import BudgetSerializer, ExpenseSerializer, FinancialGoalSerializer
+
+# Response key -> (DeletionLog.model, queryset factory, serializer)
+SYNCED = {
+    "expenses": ("expense", lambda user: Expense.objects.filter(user=user), ExpenseSerializer),
+    "budgets": (
+        "budget",
+        lambda user: Budget.objects.filter(user=user).select_related("category"),
+        BudgetSerializer,
+    ),
+    "goals": ("goal", lambda user: FinancialGoal.objects.filter(user=user), FinancialGoalSerializer),
+}
+MODEL_KEYS = {model: key for key, (model, _, _) in SYNCED.items()}
+
+
+class CursorExpired(Exception):
+    """The cursor predates the retained tombstones; the client must resync fully"""
+
+
+def encode_cursor(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_cursor(cursor):
+    """Parse a cursor, raising ``ValueError`` when it is malformed"""
+    micros = int(cursor)
+    if micros < 0:
+        raise ValueError("negative cursor")
+    return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+
+
+def log_deletion(instance):
+    """Record a tombstone for a synced model instance"""
+    model = {Expense: "expense", Budget: "budget", FinancialGoal: "goal"}[type(instance)]
+    DeletionLog.objects.create(user_id=instance.user_id, model=model, object_id=instance.pk)
+
+
+def touch_category_budgets(category):
+    """Resend a renamed category's budgets, which carry ``category_name``"""
+    Budget.objects.filter(category=category).update(updated_at=timezone.now())
+
+
+def changes(user, since=None):
+    """Rows changed and ids deleted since ``since`` (everything when ``None``)"""
+    options = settings.SYNC
+    cursor = timezone.now()
+    if since is not None and since < cursor - timedelta(days=options["TOMBSTONE_RETENTION_DAYS"]):
+        raise CursorExpired()
+
+    data = {"cursor": encode_cursor(cursor), "full": since is None}
+    window = since - timedelta(seconds=options["CURSOR_OVERLAP_SECONDS"]) if since else None
+    for key, (_, queryset, serializer) in SYNCED.items():
+        rows = queryset(user).order_by("id")
+        if window is not None:
+            rows = rows.filter(updated_at__gte=window)
+        data[key] = serializer(rows, many=True).data
+
+    deleted = {key: [] for key in SYNCED}
+    if window is not None:
+        tombstones = DeletionLog.objects.filter(user=user, deleted_at__gte=window)
+        for model, object_id in tombstones.values_list("model", "object_id"):
+            deleted[MODEL_KEYS[model]].append(object_id)
+    data["deleted"] = deleted
+    return data
+
+
+def prune_tombstones():
+    """Delete tombstones older than the retention window"""
+    cutoff = timezone.now() - timedelta(days=settings.SYNC["TOMBSTONE_RETENTION_DAYS"])
+    deleted, _ = DeletionLog.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,86 @@
+"""Budget and anomaly alerts drained from the expense event queue (api/alerts.py)"""
+import smtplib
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.alerts import deliver_notifications, process_events
+from api.models import Budget, Category, Expense, ExpenseEvent, Notification
+
+
+class DisconnectingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+
+
+class AlertTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alerts", "alerts@example.com", "alerts-password")
+        self.today = timezone.now().date()
+
+    def add(self, amount, category="Food", day=None):
+        return Expense.objects.create(
+            user=self.user, amount=Decimal(amount), description="Groceries", category=category, date=day or self.today
+        )
+
+    def kinds(self):
+        return sorted(Notification.objects.filter(user=self.user).values_list("kind", flat=True))
+
+    def test_each_budget_threshold_is_reported_once_a_month(self):
+        Budget.objects.create(user=self.user, category=Category.objects.create(user=self.user, name="Food"), limit=100)
+
+        self.add("85.00")
+        process_events()
+        self.assertEqual(self.kinds(), ["budget_threshold"])
+
+        self.add("5.00")
+        process_events()
+        self.assertEqual(self.kinds(), ["budget_threshold"])
+
+        self.add("20.00")
+        process_events()
+        self.assertEqual(self.kinds(), ["budget_exceeded", "budget_threshold"])
+
+        self.add("1.00")
+        process_events()
+        self.assertEqual(len(self.kinds()), 2)
+        self.assertFalse(ExpenseEvent.objects.exists())
+
+    def test_anomaly_is_reported_once_per_expense(self):
+        last_year = self.today - timedelta(days=365)
+        for _ in range(10):
+            self.add("100.00", category="Travel", day=last_year)
+        process_events()
+        self.assertEqual(self.kinds(), [])
+
+        outlier = self.add("1000.00", category="Travel")
+        process_events()
+        self.assertEqual(self.kinds(), ["anomaly"])
+
+        # An edit enqueues the expense again; its alert is not repeated
+        outlier.description = "Flight"
+        outlier.save()
+        process_events()
+        self.assertEqual(self.kinds(), ["anomaly"])
+
+    def test_notifications_are_emailed_once_per_user(self):
+        Notification.objects.create(user=self.user, kind="anomaly", category="Food", message="One", dedupe_key="a:1")
+        Notification.objects.create(user=self.user, kind="anomaly", category="Food", message="Two", dedupe_key="a:2")
+
+        self.assertEqual(deliver_notifications(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("2 new alerts", mail.outbox[0].subject)
+        self.assertEqual(deliver_notifications(), 0)
+
+    @override_settings(EMAIL_BACKEND="api.tests.test_alerts.DisconnectingBackend")
+    def test_smtp_failure_leaves_notifications_pending(self):
+        Notification.objects.create(user=self.user, kind="anomaly", category="Food", message="One", dedupe_key="a:1")
+
+        with self.assertLogs("api.alerts", "ERROR"):
+            self.assertEqual(deliver_notifications(), 0)
+        self.assertTrue(Notification.objects.filter(user=self.user, emailed_at__isnull=True).exists())
@@ -0,0 +1,59 @@
+"""Vectorized monthly forecasting models (api/forecasting.py)"""
+import numpy as np
+from django.test import SimpleTestCase
+
+from api.forecasting import SEASON, forecast
+
+
+def seasonal_series(years, trend=2.0):
+    months = np.arange(years * SEASON)
+    return 100 + trend * months + 30 * np.sin(2 * np.pi * months / SEASON)
+
+
+class ForecastTests(SimpleTestCase):
+    def test_linear_extends_an_exact_trend(self):
+        mean, lower, upper, models = forecast([[10, 15, 20, 25, 30, 35]], "linear", horizon=3)
+        np.testing.assert_allclose(mean, [[40, 45, 50]])
+        np.testing.assert_allclose(lower, mean)
+        np.testing.assert_allclose(upper, mean)
+        self.assertEqual(models, ["linear"])
+
+    def test_months_before_first_use_are_ignored(self):
+        mean, *_ = forecast([[0, 0, 0, 10, 20, 30]], "linear", horizon=1)
+        np.testing.assert_allclose(mean, [[40]])
+
+    def test_ses_holds_a_flat_level(self):
+        mean, lower, upper, _ = forecast([[50.0] * 8], "ses", horizon=2)
+        np.testing.assert_allclose(mean, [[50, 50]])
+        np.testing.assert_allclose(upper - lower, 0, atol=1e-9)
+
+    def test_seasonal_naive_repeats_last_year(self):
+        series = np.arange(1, 2 * SEASON + 1, dtype=float)
+        mean, *_ = forecast([series], "seasonal_naive", horizon=3)
+        np.testing.assert_allclose(mean, [series[SEASON : SEASON + 3]])
+
+    def test_holt_winters_tracks_trend_and_season(self):
+        history = seasonal_series(4)
+        truth = seasonal_series(5)[len(history) : len(history) + 3]
+        mean, lower, upper, models = forecast([history], "holt_winters", horizon=3)
+        self.assertEqual(models, ["holt_winters"])
+        np.testing.assert_allclose(mean[0], truth, rtol=0.05)
+        self.assertTrue(np.all(lower <= mean) and np.all(mean <= upper))
+
+    def test_seasonal_models_fall_back_on_short_history(self):
+        rows = [seasonal_series(1)[:6], seasonal_series(2)[:18], seasonal_series(3)]
+        width = max(len(row) for row in rows)
+        # Left-pad with zeros: each row starts when its category was first used
+        series = [np.concatenate([np.zeros(width - len(row)), row]) for row in rows]
+        *_, models = forecast(series, "holt_winters", horizon=1)
+        self.assertEqual(models, ["ses", "seasonal_naive", "holt_winters"])
+
+    def test_forecasts_are_clipped_at_zero(self):
+        mean, lower, upper, _ = forecast([[50, 40, 30, 20, 10, 1]], "linear", horizon=3)
+        self.assertTrue(np.all(mean >= 0) and np.all(lower >= 0) and np.all(upper >= 0))
+
+    def test_rejects_unknown_model_and_interval(self):
+        with self.assertRaises(ValueError):
+            forecast([[1, 2, 3]], "arima")
+        with self.assertRaises(ValueError):
+            forecast([[1, 2, 3]], "linear", interval=0.75)
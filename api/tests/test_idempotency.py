@@ -0,0 +1,93 @@
+"""Idempotency-Key handling on expense creation (api/idempotency.py)"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import Client, TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.models import Expense, IdempotencyKey
+
+EXPENSE = {"amount": "12.50", "description": "Tea", "category": "Food", "date": "2024-01-05"}
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("idempotent", "idempotent@example.com", "idempotent-password")
+        self.client = Client(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+
+    def post(self, data=EXPENSE, key="retry-1"):
+        return self.client.post(
+            "/api/expenses/", data, content_type="application/json", secure=True, headers={"Idempotency-Key": key}
+        )
+
+    def test_retry_replays_the_first_response(self):
+        first = self.post()
+        retry = self.post()
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 1)
+
+    def test_reusing_a_key_for_another_body_is_rejected(self):
+        self.post()
+        response = self.post({**EXPENSE, "amount": "99.00"})
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 1)
+
+    def test_retry_while_the_first_request_runs_gets_409(self):
+        self.post()
+        IdempotencyKey.objects.filter(user=self.user).update(status_code=None, response=None)
+
+        response = self.post()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_claim_of_a_request_that_died_is_taken_over(self):
+        self.post()
+        IdempotencyKey.objects.filter(user=self.user).update(
+            status_code=None, response=None, created_at=timezone.now() - timedelta(minutes=5)
+        )
+
+        response = self.post()
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertEqual(IdempotencyKey.objects.get(user=self.user).status_code, 201)
+        self.assertEqual(self.post()["Idempotent-Replayed"], "true")
+
+    def test_expired_key_runs_the_request_again(self):
+        self.post()
+        IdempotencyKey.objects.filter(user=self.user).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        response = self.post({**EXPENSE, "amount": "99.00"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 2)
+
+    def test_keys_are_scoped_per_user(self):
+        self.post()
+        other = User.objects.create_user("other", "other@example.com", "other-password")
+        self.client = Client(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=other).key}")
+
+        response = self.post()
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+
+    def test_oversized_key_is_rejected(self):
+        response = self.post(key="k" * 256)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Expense.objects.filter(user=self.user).exists())
+
+    def test_exceptions_release_the_key(self):
+        # get_object() raises Http404; DRF turns it into the response outside the decorator
+        response = self.client.post(
+            "/api/goals/0/update_contribution/",
+            {"amount": "10"},
+            content_type="application/json",
+            secure=True,
+            headers={"Idempotency-Key": "missing-goal"},
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(IdempotencyKey.objects.filter(user=self.user).exists())
@@ -0,0 +1,284 @@
+"""Query budgets for every route registered in api/urls.py
+
+Each route is called against fixtures of increasing size. A call fails when
+its SQL query count exceeds its budget or changes with the number of rows, and
+the failure lists the offending queries.
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.models import Budget, Category, Expense, FinancialGoal, Notification, RecurringExpense
+from api.sync import encode_cursor
+
+SIZES = (1, 5, 25)
+DEFAULT_BUDGET = 8
+
+
+@dataclass
+class Call:
+    method: str
+    path: str
+    data: dict = field(default_factory=dict)
+    label: str = ""
+    headers: dict = field(default_factory=dict)
+    budget: int = DEFAULT_BUDGET
+    status: int = 200
+
+
+# Paths are formatted with the fixture's object ids
+CALLS = {
+    "api-root": [Call("get", "/api/")],
+    "expense-list": [
+        Call("get", "/api/expenses/"),
+        # Expense writes also maintain the spending summary and monthly counters
+        # Keyed writes run in a transaction with their stored response (2 more statements)
+        Call("post", "/api/expenses/", {"amount": "12.50", "description": "Tea", "category": "Food", "date": "2024-01-05"}, budget=10, status=201),
+        Call("post", "/api/expenses/", {"amount": "12.50", "description": "Tea", "category": "Food", "date": "2024-01-05"}, label="idempotency key", headers={"Idempotency-Key": "budget-retry"}, budget=17, status=201),
+    ],
+    "expense-detail": [
+        Call("get", "/api/expenses/{expense}/"),
+        Call("patch", "/api/expenses/{expense}/", {"amount": "20.00"}, budget=10),
+        Call("delete", "/api/expenses/{expense}/", budget=10, status=204),
+    ],
+    "category-list": [Call("get", "/api/categories/"), Call("post", "/api/categories/", {"name": "Pets"}, status=201)],
+    "category-detail": [Call("get", "/api/categories/{category}/"), Call("delete", "/api/categories/{category}/", status=204)],
+    "budget-list": [
+        Call("get", "/api/budgets/"),
+        Call("get", "/api/budgets/?period=week"),
+        Call("get", "/api/budgets/?period=custom&start=2024-01-01&end=2024-03-31"),
+        Call("get", "/api/budgets/?period=custom", label="custom without range", status=400),
+        Call("post", "/api/budgets/", {"category": "{category}", "limit": "5000"}, status=201),
+    ],
+    "budget-bulk": [
+        Call("post", "/api/budgets/bulk/", {"budgets": [{"category": "{category}", "limit": "750"}]}),
+        Call("post", "/api/budgets/bulk/", {"budgets": [{"category": "{category}"}]}, label="missing limit", status=400),
+    ],
+    "budget-detail": [Call("get", "/api/budgets/{budget}/"), Call("patch", "/api/budgets/{budget}/", {"limit": "900"})],
+    "goal-list": [Call("get", "/api/goals/")],
+    "goal-detail": [Call("get", "/api/goals/{goal}/")],
+    "notification-list": [Call("get", "/api/notifications/"), Call("get", "/api/notifications/?unread=true")],
+    "notification-detail": [Call("get", "/api/notifications/{notification}/")],
+    "notification-mark-read": [
+        Call("post", "/api/notifications/mark_read/", {}),
+        Call("post", "/api/notifications/mark_read/", {"ids": ["{notification}"]}, label="by id"),
+    ],
+    "goal-update-contribution": [
+        Call("post", "/api/goals/{goal}/update_contribution/", {"amount": "100"}),
+        Call("post", "/api/goals/{goal}/update_contribution/", {"amount": "100"}, label="idempotency key", headers={"Idempotency-Key": "budget-retry"}, budget=12),
+    ],
+    "register": [Call("post", "/api/auth/register/", {"username": "budget_new", "email": "n@example.com", "password": "pw-123456789"}, budget=12, status=201)],
+    "login": [Call("post", "/api/auth/login/", {"username": "{username}", "password": "budget-password"})],
+    "profile": [Call("get", "/api/auth/profile/")],
+    "change-password": [Call("post", "/api/auth/change-password/", {"current_password": "budget-password", "new_password": "new-password-1"})],
+    "update-email": [Call("post", "/api/auth/update-email/", {"new_email": "changed@example.com"})],
+    "predictions": [
+        Call("get", f"/api/predictions/?model={model}") for model in ("linear", "ses", "seasonal_naive", "holt_winters")
+    ],
+    "stats": [Call("get", "/api/stats/")],
+    "sync": [
+        Call("get", "/api/sync/"),
+        Call("get", "/api/sync/?since={cursor}", label="since cursor"),
+        Call("get", "/api/sync/?since=1", label="expired cursor", status=410),
+        Call("get", "/api/sync/?since=nope", label="bad cursor", status=400),
+    ],
+    "dashboard": [
+        Call("get", "/api/dashboard/", budget=10),
+        Call("get", "/api/dashboard/?sections=summary,budgets&recent=20"),
+        Call("get", "/api/dashboard/?sections=nope", label="unknown section", status=400),
+    ],
+    "trends": [
+        Call("get", f"/api/trends/?bucket={bucket}&start=2020-01-01") for bucket in ("day", "week", "month", "year")
+    ],
+    "search": [
+        Call("get", "/api/search/?q=uber&limit=5"),
+        Call("get", "/api/search/?q=ubr+rid", label="fuzzy"),
+        Call("get", "/api/search/", label="missing q", status=400),
+    ],
+    "suggest-category": [Call("post", "/api/suggest-category/", {"description": "uber ride home"})],
+    "chatbot": [
+        Call("post", "/api/chatbot/", {"query": query}, label=query)
+        for query in [
+            "hello",
+            "how much did i spend this month",
+            "total food spending",
+            "highest expense",
+            "top categories",
+            "average food expense",
+            "median monthly expense",
+            "list my categories",
+            "recent expenses",
+            "predict next month",
+            "what are my subscriptions",
+            "budget limit status",
+            "budget status for the week",
+            "my savings goal",
+            "biggest purchase ever",
+        ]
+    ],
+    "metrics": [Call("get", "/api/metrics")],
+    "profiling": [Call("get", "/api/profiling/")],
+    "export-csv": [Call("get", "/api/export/csv/")],
+    "export-data": [Call("get", "/api/export/csv/"), Call("get", "/api/export/pdf/", label="unsupported", status=400)],
+    "password-reset-request": [Call("post", "/api/password-reset/request/", {"email": "{email}"})],
+    "validate-reset-token": [Call("post", "/api/password-reset/validate-token/", {"uid": "MQ", "token": "bad"}, status=400)],
+    "password-reset": [Call("post", "/api/password-reset/reset/", {"uid": "MQ", "token": "bad", "new_password": "whatever-123"}, status=400)],
+}
+
+# (route, label) pairs whose query count still grows with row count. Keep this
+# list shrinking: a known entry that starts passing is reported so it can go.
+KNOWN_SCALING = set()
+
+
+def registered_routes():
+    names = set()
+
+    def walk(patterns):
+        for pattern in patterns:
+            if hasattr(pattern, "url_patterns"):
+                walk(pattern.url_patterns)
+            elif pattern.name:
+                names.add(pattern.name)
+
+    walk(get_resolver("api.urls").url_patterns)
+    return names
+
+
+def build_fixture(size):
+    """A user whose categories, budgets, goals and expenses scale with ``size``"""
+    username = f"budget_user_{size}"
+    user = User.objects.create_user(username, f"{username}@example.com", "budget-password", is_staff=True)
+    token = Token.objects.create(user=user)
+    categories = [Category.objects.create(user=user, name=f"Category {i}") for i in range(size)]
+    categories.insert(0, Category.objects.create(user=user, name="Food"))
+    budgets = [Budget.objects.create(user=user, category=c, limit=Decimal("1000")) for c in categories]
+    goals = [
+        FinancialGoal.objects.create(user=user, name=f"Goal {i}", targetAmount=Decimal("5000"), deadline=date(2030, 1, 1))
+        for i in range(size)
+    ]
+    today = date.today()
+    expenses = [
+        Expense.objects.create(
+            user=user,
+            amount=Decimal(10 + i),
+            description=f"uber ride {i}",
+            category=categories[i % len(categories)].name,
+            date=today - timedelta(days=15 * (i % 12)),
+        )
+        for i in range(size * 12)
+    ]
+    for i, category in enumerate(categories):
+        RecurringExpense.objects.create(
+            user=user,
+            description=f"subscription {i}",
+            category=category.name,
+            amount=Decimal("199"),
+            frequency="monthly",
+            period_days=30,
+            occurrences=6,
+            last_date=today,
+            next_date=today + timedelta(days=30),
+            confidence=1.0,
+        )
+    notifications = [
+        Notification.objects.create(
+            user=user, kind="anomaly", category=category.name, message="Unusual expense", dedupe_key=f"anomaly:{i}"
+        )
+        for i, category in enumerate(categories)
+    ]
+    # A category without a budget so budget creation has something to do
+    spare = Category.objects.create(user=user, name="Unbudgeted")
+    return {
+        "token": token.key,
+        "ids": {
+            "expense": expenses[0].pk,
+            "category": spare.pk,
+            "budget": budgets[0].pk,
+            "goal": goals[0].pk if goals else 0,
+            "notification": notifications[0].pk,
+            "cursor": encode_cursor(timezone.now() - timedelta(days=1)),
+            "username": username,
+            "email": user.email,
+        },
+    }
+
+
+def format_value(value, ids):
+    if isinstance(value, str):
+        # A bare placeholder keeps the id's type, so JSON bodies carry numbers
+        if value.startswith("{") and value.endswith("}") and value[1:-1] in ids:
+            return ids[value[1:-1]]
+        return value.format(**ids)
+    if isinstance(value, list):
+        return [format_value(item, ids) for item in value]
+    if isinstance(value, dict):
+        return {key: format_value(item, ids) for key, item in value.items()}
+    return value
+
+
+def run_call(call, fixture):
+    """Execute a call inside a rolled-back transaction, returning status and SQL"""
+    client = Client(HTTP_AUTHORIZATION=f"Token {fixture['token']}")
+    ids = fixture["ids"]
+    path = call.path.format(**ids)
+    data = {key: format_value(value, ids) for key, value in call.data.items()}
+
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as ctx:
+            method = getattr(client, call.method)
+            if call.method == "get":
+                response = method(path, secure=True, headers=call.headers)
+            else:
+                response = method(path, data, content_type="application/json", secure=True, headers=call.headers)
+        transaction.set_rollback(True)
+    return response.status_code, [query["sql"] for query in ctx.captured_queries]
+
+
+# The endpoints themselves are measured, not the rate limiter
+@override_settings(THROTTLE={**settings.THROTTLE, "ENABLED": False})
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Expected 4xx responses would otherwise be logged as warnings
+        logger = logging.getLogger("django.request")
+        cls.addClassCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.ERROR)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = {size: build_fixture(size) for size in SIZES}
+
+    def test_every_route_has_calls(self):
+        missing = registered_routes() - set(CALLS)
+        self.assertFalse(missing, f"routes without query-budget calls: {', '.join(sorted(missing))}")
+
+    def test_query_budgets(self):
+        for name, calls in sorted(CALLS.items()):
+            for call in calls:
+                label = call.label or f"{call.method.upper()} {call.path}"
+                with self.subTest(route=name, call=label):
+                    counts, statuses, largest = [], [], []
+                    for size in SIZES:
+                        status, queries = run_call(call, self.fixtures[size])
+                        counts.append(len(queries))
+                        statuses.append(status)
+                        largest = queries
+
+                    self.assertEqual(statuses, [call.status] * len(SIZES), f"unexpected status {statuses}")
+                    failed = len(set(counts)) > 1 or max(counts) > call.budget
+                    summary = f"queries {counts} (budget {call.budget}, status {statuses})"
+                    if (name, label) in KNOWN_SCALING:
+                        self.assertTrue(failed, f"{summary}: now bounded, remove it from KNOWN_SCALING")
+                    elif failed:
+                        self.fail("\n".join([summary, *(f"    {sql}" for sql in largest)]))
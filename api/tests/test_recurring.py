@@ -0,0 +1,44 @@
+"""Incremental recurring expense detection (api/recurring.py)"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import Expense, RecurringExpense
+from api.recurring import run_detection
+from api.versioning import bump_data_version
+
+
+class RecurringDetectionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("recurring", "recurring@example.com", "recurring-password")
+
+    def add_monthly(self, months, start=date(2024, 1, 3)):
+        return [
+            Expense.objects.create(
+                user=self.user, amount=Decimal("15.99"), description=f"Netflix #{i}", category="Entertainment",
+                date=start + timedelta(days=30 * i),
+            )
+            for i in range(months)
+        ]
+
+    def test_only_users_with_expense_changes_are_rescanned(self):
+        self.add_monthly(4)
+        self.assertEqual(run_detection(), (1, 1))
+        self.assertEqual(RecurringExpense.objects.get(user=self.user).frequency, "monthly")
+
+        # Profile/budget edits bump the data version but leave expenses alone
+        Expense.objects.filter(user=self.user).update(updated_at=timezone.now() - timedelta(hours=1))
+        bump_data_version(self.user.pk)
+        self.assertEqual(run_detection(), (0, 0))
+
+    def test_deleted_expenses_are_picked_up(self):
+        expenses = self.add_monthly(3)
+        run_detection()
+        self.assertTrue(RecurringExpense.objects.filter(user=self.user).exists())
+
+        expenses[-1].delete()
+        self.assertEqual(run_detection(), (1, 1))
+        self.assertFalse(RecurringExpense.objects.filter(user=self.user).exists())
@@ -0,0 +1,86 @@
+"""Spending counters kept in step with expense writes (api/summary.py)"""
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from api import summary
+from api.models import Expense, UserSpendingSummary
+
+
+class SpendingSummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("summary", "summary@example.com", "summary-password")
+
+    def add(self, amount, day=date(2024, 1, 15), currency="INR"):
+        return Expense.objects.create(
+            user=self.user, amount=Decimal(amount), currency=currency, description="Lunch", category="Food", date=day
+        )
+
+    def test_writes_keep_lifetime_totals(self):
+        first = self.add("100.00")
+        second = self.add("50.50")
+        self.assertEqual(summary.lifetime(self.user), (Decimal("150.50"), 2))
+
+        first.amount = Decimal("80.00")
+        first.save()
+        self.assertEqual(summary.lifetime(self.user), (Decimal("130.50"), 2))
+
+        second.delete()
+        self.assertEqual(summary.lifetime(self.user), (Decimal("80.00"), 1))
+
+    def test_editing_the_date_moves_the_month(self):
+        expense = self.add("40.00", day=date(2024, 1, 31))
+        expense.date = date(2024, 2, 1)
+        expense.save()
+
+        self.assertEqual(summary.month_total(self.user, date(2024, 1, 1), date(2024, 2, 1)), Decimal("0.00"))
+        self.assertEqual(summary.month_total(self.user, date(2024, 2, 1), date(2024, 3, 1)), Decimal("40.00"))
+
+    def test_highest_expense_follows_edits_and_deletes(self):
+        top = self.add("500.00")
+        runner_up = self.add("300.00")
+        self.assertEqual(summary.highest_expense(self.user), top)
+
+        top.amount = Decimal("100.00")
+        top.save()
+        self.assertEqual(summary.highest_expense(self.user), runner_up)
+
+        runner_up.delete()
+        self.assertEqual(summary.highest_expense(self.user), top)
+
+    def test_ties_keep_the_oldest_expense_like_rebuild(self):
+        first = self.add("50.00")
+        second = self.add("50.00")
+        self.assertEqual(summary.highest_expense(self.user), first)
+        self.assertEqual(summary.rebuild([self.user.pk]), [])
+
+        # Raising a newer expense to the maximum does not take the spot either
+        third = self.add("20.00")
+        third.amount = Decimal("50.00")
+        third.save()
+        first.delete()
+        self.assertEqual(summary.highest_expense(self.user), second)
+        self.assertEqual(summary.rebuild([self.user.pk]), [])
+
+    def test_highest_expense_compares_converted_amounts(self):
+        self.add("5000.00")
+        dollars = self.add("100.00", currency="USD")
+        self.assertEqual(summary.highest_expense(self.user), dollars)
+
+    def test_highest_expense_falls_back_to_the_expenses_table(self):
+        expense = self.add("75.00")
+        UserSpendingSummary.objects.filter(user=self.user).delete()
+        self.assertEqual(summary.highest_expense(self.user), expense)
+
+    def test_rebuild_repairs_writes_that_bypassed_signals(self):
+        self.add("10.00")
+        Expense.objects.bulk_create(
+            [Expense(user=self.user, amount=Decimal("25.00"), description="Bulk", category="Food", date=date(2024, 1, 20))]
+        )
+        self.assertEqual(summary.lifetime(self.user), (Decimal("10.00"), 1))
+
+        self.assertEqual(summary.rebuild([self.user.pk]), [self.user.pk])
+        self.assertEqual(summary.lifetime(self.user), (Decimal("35.00"), 2))
+        self.assertEqual(summary.rebuild([self.user.pk]), [])
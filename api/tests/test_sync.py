@@ -0,0 +1,26 @@
+"""Delta sync for offline clients (api/sync.py)"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from api import sync
+from api.models import Budget, Category
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("sync", "sync@example.com", "sync-password")
+
+    def test_renaming_a_category_resends_its_budgets(self):
+        category = Category.objects.create(user=self.user, name="Food")
+        budget = Budget.objects.create(user=self.user, category=category, limit=100)
+        Budget.objects.filter(pk=budget.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        since = timezone.now()
+        self.assertEqual(sync.changes(self.user, since)["budgets"], [])
+
+        category.name = "Groceries"
+        category.save()
+        budgets = sync.changes(self.user, since)["budgets"]
+        self.assertEqual([row["category_name"] for row in budgets], ["Groceries"])
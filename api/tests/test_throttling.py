@@ -0,0 +1,88 @@
+"""Token buckets behind the cost-weighted throttles (api/throttling.py)"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.throttling import BucketStore
+
+
+class BucketStoreTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = BucketStore(os.path.join(directory.name, "throttle.sqlite3"))
+
+    def take(self, cost, now, key="user:1"):
+        return self.store.take(key, cost, capacity=10, refill_per_second=1.0, now=now)
+
+    def test_bucket_drains_then_refills(self):
+        self.assertEqual(self.take(6, now=100.0), 0)
+        self.assertEqual(self.take(4, now=100.0), 0)
+        # Empty: 3 tokens take 3 seconds at one token per second
+        self.assertEqual(self.take(3, now=100.0), 3.0)
+        self.assertEqual(self.take(3, now=103.0), 0)
+
+    def test_refill_stops_at_capacity(self):
+        self.take(10, now=0.0)
+        self.assertEqual(self.take(10, now=1000.0), 0)
+        self.assertEqual(self.take(1, now=1000.0), 1.0)
+
+    def test_cost_above_capacity_is_clamped(self):
+        self.assertEqual(self.take(50, now=0.0), 0)
+        self.assertEqual(self.take(1, now=0.0), 1.0)
+
+    def test_buckets_are_per_key(self):
+        self.take(10, now=0.0)
+        self.assertEqual(self.take(10, now=0.0, key="user:2"), 0)
+
+    def test_clock_going_backwards_does_not_refill(self):
+        self.take(10, now=50.0)
+        self.assertEqual(self.take(1, now=10.0), 1.0)
+
+
+class CostThrottleTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.throttle(os.path.join(self.directory, "throttle.sqlite3"))
+        user = User.objects.create_user("throttled", "throttled@example.com", "throttled-password")
+        self.client = Client(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+
+    def throttle(self, store):
+        override = override_settings(
+            THROTTLE={**settings.THROTTLE, "ENABLED": True, "STORE": store, "CAPACITY": 60, "REFILL_PER_MINUTE": 1}
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def predictions(self, **headers):
+        return self.client.get("/api/predictions/", secure=True, headers=headers)
+
+    def test_expensive_calls_are_throttled_with_retry_after(self):
+        cost = settings.THROTTLE["COSTS"]["predictions"]
+        statuses = [self.predictions().status_code for _ in range(60 // cost)]
+        self.assertEqual(set(statuses), {200})
+
+        response = self.predictions()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+
+    def test_revalidations_cost_a_single_token(self):
+        etag = self.predictions()["ETag"]
+        statuses = [self.predictions(**{"If-None-Match": etag}).status_code for _ in range(50)]
+        self.assertEqual(set(statuses), {304})
+        # 60 - 10 - 50 leaves nothing for a full recompute
+        self.assertEqual(self.predictions().status_code, 429)
+
+    def test_unusable_store_lets_requests_through(self):
+        blocker = os.path.join(self.directory, "not-a-directory")
+        open(blocker, "w").close()
+        self.throttle(os.path.join(blocker, "throttle.sqlite3"))
+
+        with self.assertLogs("api.throttling", "ERROR"):
+            self.assertEqual(self.predictions().status_code, 200)
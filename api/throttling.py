@@ -0,0 +1,176 @@
+"""Cost-weighted token-bucket throttling for the expensive endpoints
+
+Every user (or anonymous IP) has one bucket of ``THROTTLE["CAPACITY"]`` tokens
+refilled at ``THROTTLE["REFILL_PER_MINUTE"]``. Each throttled endpoint takes
+its weight from ``THROTTLE["COSTS"]``, so a client can burst a few predictions
+or many chatbot questions, but not hog the workers with either. Revalidations
+of ETagged endpoints that will be answered with 304 cost
+``THROTTLE["REVALIDATE_COST"]``, so polling stays cheap.
+
+Buckets live in a small SQLite file shared by every worker process on the host.
+Each take is one transaction, serialised across processes by an ``flock`` on a
+sidecar lock file: the kernel hands the lock straight to the next waiter,
+where SQLite's own busy handler would sleep and retry. If the store fails the
+request is let through: throttling protects capacity, it should not take the
+API down with it.
+"""
+import fcntl
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from api import metrics
+from api.versioning import is_revalidation
+
+logger = logging.getLogger(__name__)
+
+# Full buckets are indistinguishable from missing ones; drop them now and then
+PRUNE_EVERY = 1000
+
+
+class BucketStore:
+    """Token buckets in a SQLite file, safe across threads and processes"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            # Never reuse a connection inherited across fork
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # One open file per thread, so threads queue on the lock like processes do
+            lock = open(f"{self.path}.lock", "a")
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+                # Losing the last few takes in a power cut is fine
+                connection.execute("PRAGMA synchronous=OFF")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS buckets "
+                    "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+                )
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            self._local.lock, self._local.connection, self._local.pid = lock, connection, os.getpid()
+        return connection
+
+    def take(self, key, cost, capacity, refill_per_second, now=None):
+        """Spend ``cost`` tokens; returns 0 when allowed, else seconds until it would be"""
+        cost = min(cost, capacity)
+        connection = self._connection()
+        lock = self._local.lock
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Read the clock under the lock: a stale time written after waiting
+                # for it would let the next caller count the same refill twice
+                now = max(time.time() if now is None else now, 0.0)
+                row = connection.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    tokens = capacity
+                else:
+                    now = max(now, row[1])
+                    tokens = min(capacity, row[0] + (now - row[1]) * refill_per_second)
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                connection.execute(
+                    "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                    (key, tokens, now),
+                )
+                self._takes += 1
+                if self._takes % PRUNE_EVERY == 0:
+                    connection.execute("DELETE FROM buckets WHERE updated < ?", (now - capacity / refill_per_second,))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+        return 0.0 if allowed else (cost - tokens) / refill_per_second
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def bucket_store():
+    global _store
+    path = settings.THROTTLE["STORE"]
+    if _store is None or _store.path != str(path):
+        with _store_lock:
+            if _store is None or _store.path != str(path):
+                _store = BucketStore(path)
+    return _store
+
+
+class CostThrottle(BaseThrottle):
+    """Charge ``THROTTLE["COSTS"][scope]`` tokens from the caller's shared bucket"""
+
+    scope = None
+    # Set for views behind conditional_on_data_version, whose 304s are cheap
+    conditional = False
+
+    def allow_request(self, request, view):
+        options = settings.THROTTLE
+        if not options["ENABLED"]:
+            return True
+
+        cost = options["COSTS"][self.scope]
+        if request.user and request.user.is_authenticated:
+            key = f"user:{request.user.pk}"
+            # Throttles run before the view, so charge a revalidation the 304 it will get
+            if self.conditional and is_revalidation(request):
+                cost = min(cost, options["REVALIDATE_COST"])
+        else:
+            key = f"ip:{self.get_ident(request)}"
+        try:
+            self.wait_seconds = bucket_store().take(
+                key, cost, options["CAPACITY"], options["REFILL_PER_MINUTE"] / 60
+            )
+        except (sqlite3.Error, OSError):
+            logger.exception("Throttle store unavailable, allowing the request")
+            metrics.inc("api_throttle_requests_total", scope=self.scope, result="error")
+            return True
+
+        allowed = not self.wait_seconds
+        metrics.inc("api_throttle_requests_total", scope=self.scope, result="allowed" if allowed else "throttled")
+        return allowed
+
+    def wait(self):
+        # DRF turns this into the Retry-After header
+        return math.ceil(self.wait_seconds)
+
+
+class PredictionsThrottle(CostThrottle):
+    scope = "predictions"
+    conditional = True
+
+
+class DashboardThrottle(CostThrottle):
+    scope = "dashboard"
+    conditional = True
+
+
+class ChatbotThrottle(CostThrottle):
+    scope = "chatbot"
+
+
+class ExportThrottle(CostThrottle):
+    scope = "export"
+
+
+class SuggestCategoryThrottle(CostThrottle):
+    scope = "suggest_category"
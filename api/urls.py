@@ -7,6 +7,7 @@ router.register(r"expenses", views.ExpenseViewSet, basename="expense")
 router.register(r"categories", views.CategoryViewSet, basename="category")
 router.register(r"budgets", views.BudgetViewSet, basename="budget")
 router.register(r"goals", views.FinancialGoalViewSet, basename="goal")
+router.register(r"notifications", views.NotificationViewSet, basename="notification")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -15,8 +16,15 @@ urlpatterns = [
     path("auth/profile/", views.get_user_profile, name="profile"),
     path("auth/change-password/", views.change_password, name="change-password"),
     path("predictions/", views.get_predictions, name="predictions"),
+    path("trends/", views.get_trends, name="trends"),
+    path("stats/", views.get_expense_stats, name="stats"),
+    path("dashboard/", views.get_dashboard, name="dashboard"),
+    path("sync/", views.sync_changes, name="sync"),
+    path("search/", views.search_expenses, name="search"),
     path("suggest-category/", views.suggest_category_api, name="suggest-category"),
     path("chatbot/", views.chatbot_query, name="chatbot"),
+    path("metrics", views.prometheus_metrics, name="metrics"),
+    path("profiling/", views.profiling_stats, name="profiling"),
     path("export/csv/", views.export_csv, name="export-csv"),
     path("export/<str:format_type>/", views.export_data, name="export-data"),
     path('auth/update-email/', views.update_email, name='update-email'),
@@ -0,0 +1,178 @@
+"""Per-user data versions backing ETag / conditional GET support"""
+import hashlib
+import threading
+from functools import wraps
+from time import time_ns
+
+from django.core.signals import request_finished, request_started
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from api import metrics
+from api.currency import rate_table
+from api.models import UserDataVersion
+
+
+# Versions already read during the current request, so the ETag check, the
+# column store and cached handlers share one lookup. Only active inside a request.
+_request_state = threading.local()
+
+
+def _start_request(**kwargs):
+    _request_state.versions = {}
+
+
+def _end_request(**kwargs):
+    _request_state.versions = None
+
+
+request_started.connect(_start_request, dispatch_uid="api.versioning.start")
+request_finished.connect(_end_request, dispatch_uid="api.versioning.end")
+
+
+def get_data_version(user):
+    """Return the user's current data version (0 if nothing was written yet)"""
+    versions = getattr(_request_state, "versions", None)
+    if versions is not None and user.pk in versions:
+        return versions[user.pk]
+
+    version = (
+        UserDataVersion.objects.filter(user_id=user.pk)
+        .values_list("version", flat=True)
+        .first()
+    ) or 0
+    if versions is not None:
+        versions[user.pk] = version
+    return version
+
+
+def _next_version():
+    # Microsecond clock floor: a version handed out by a rolled-back
+    # transaction is never reused for different data
+    return Greatest(F("version") + 1, Value(time_ns() // 1000))
+
+
+def bump_data_version(user_id):
+    """Increment the user's data version after a write"""
+    versions = getattr(_request_state, "versions", None)
+    if versions is not None:
+        versions.pop(user_id, None)
+
+    updated = UserDataVersion.objects.filter(user_id=user_id).update(
+        version=_next_version(), updated_at=timezone.now()
+    )
+    if updated:
+        return
+
+    _, created = UserDataVersion.objects.get_or_create(
+        user_id=user_id, defaults={"version": time_ns() // 1000}
+    )
+    if not created:
+        # Lost the race to create the row, bump the one that won
+        UserDataVersion.objects.filter(user_id=user_id).update(
+            version=_next_version(), updated_at=timezone.now()
+        )
+
+
+def data_version_etag(request, version):
+    """Build a strong ETag for the request path at the given data version"""
+    # Month-to-date figures roll over without any write, so the day is part of the tag,
+    # and converted amounts change with the FX table
+    raw = (
+        f"{request.user.pk}:{version}:{timezone.now().date()}:{rate_table().version}:"
+        f"{request.get_full_path()}"
+    )
+    return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+
+def _if_none_match(request, etag):
+    header = request.META.get("HTTP_IF_NONE_MATCH")
+    # Compression middleware weakens ETags, compare them weakly
+    candidates = {tag.removeprefix("W/") for tag in parse_etags(header or "")}
+    return "*" in candidates or etag in candidates
+
+
+def etag_matches(request, etag):
+    """Check the request's If-None-Match header against an ETag"""
+    matched = _if_none_match(request, etag)
+    metrics.inc("api_cache_requests_total", cache="etag", result="hit" if matched else "miss")
+    return matched
+
+
+def is_revalidation(request):
+    """True when a GET's If-None-Match matches the user's current data-version ETag"""
+    if request.method not in ("GET", "HEAD") or "HTTP_IF_NONE_MATCH" not in request.META:
+        return False
+    return _if_none_match(request, data_version_etag(request, get_data_version(request.user)))
+
+
+def not_modified(etag):
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    return tag_response(response, etag)
+
+
+def tag_response(response, etag):
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_on_data_version(view_func):
+    """Answer GETs with 304 when the user's data version has not changed"""
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view_func(request, *args, **kwargs)
+
+        etag = data_version_etag(request, get_data_version(request.user))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            tag_response(response, etag)
+        return response
+
+    return wrapper
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+    def __init__(self, etag):
+        super().__init__()
+        self.etag = etag
+
+
+class DataVersionETagMixin:
+    """ViewSet mixin adding data-version ETags to read actions"""
+
+    etag_actions = ("list", "retrieve")
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.data_version_etag = None
+        if request.method in ("GET", "HEAD") and self.action in self.etag_actions:
+            etag = data_version_etag(request, get_data_version(request.user))
+            if etag_matches(request, etag):
+                raise NotModified(etag)
+            self.data_version_etag = etag
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return not_modified(exc.etag)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, "data_version_etag", None)
+        if etag and response.status_code == status.HTTP_200_OK:
+            tag_response(response, etag)
+        return response
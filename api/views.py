@@ -1,21 +1,18 @@
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import authenticate
-from django.db.models import Sum
 from django.db.models.functions import TruncMonth
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from django.utils import timezone
-import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from dateutil.relativedelta import relativedelta
 from django.db.models import Count
 from rest_framework.decorators import action
 from django.http import HttpResponse
-from .models import Expense, Category, Budget, FinancialGoal
+from time import perf_counter
+from .models import Expense, Category, Budget, FinancialGoal, Notification
 from .serializers import (
     ExpenseSerializer,
     CategorySerializer,
@@ -23,9 +20,11 @@ from .serializers import (
     RegisterSerializer,
     BudgetSerializer,
     FinancialGoalSerializer,
+    NotificationSerializer,
 )
 import re
 import csv
+from collections import Counter
 from io import StringIO, BytesIO
 import json
 from django.template.loader import get_template
@@ -40,7 +39,24 @@ from api.utils import (
     handle_categories_query,
     handle_savings_progress,
     handle_budget_progress,
+    handle_average_query,
+    NUMBER_RE,
 )
+from api.analytics import expense_stats, get_columns
+from api.budgets import MAX_BULK_BUDGETS, budget_status, parse_category_id, parse_limit, upsert_budgets
+from api.currency import display_currency, format_money
+from api.idempotency import idempotent
+from api.throttling import (
+    ChatbotThrottle,
+    DashboardThrottle,
+    ExportThrottle,
+    PredictionsThrottle,
+    SuggestCategoryThrottle,
+)
+from api import series as time_series
+from api.series import key_to_date
+from api import forecasting, metrics, profiling, recurring, search, summary, sync
+from api.versioning import DataVersionETagMixin, bump_data_version, conditional_on_data_version
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
@@ -48,6 +64,8 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib.auth.models import User
 
+EMAIL_RE = re.compile(r"[^@]+@[^@]+\.[^@]+")
+
 
 @api_view(["POST"])
 @permission_classes([permissions.AllowAny])
@@ -186,6 +204,7 @@ def reset_password(request):
             # Set the new password
             user.set_password(new_password)
             user.save()
+            bump_data_version(user.pk)
 
             # Invalidate all existing tokens for the user
             Token.objects.filter(user=user).delete()
@@ -236,6 +255,8 @@ def login_user(request):
     if user:
         user.last_login = timezone.now()
         user.save(update_fields=["last_login"])
+        # The dashboard's ETag'd profile section shows last_login
+        bump_data_version(user.pk)
         token, created = Token.objects.get_or_create(user=user)
         return Response({"token": token.key, "user": UserSerializer(user).data})
     return Response(
@@ -256,7 +277,7 @@ def update_email(request):
         )
 
     # Validate the new email
-    if not re.match(r"[^@]+@[^@]+\.[^@]+", new_email):
+    if not EMAIL_RE.match(new_email):
         return Response(
             {"error": "Invalid email format"},
             status=status.HTTP_400_BAD_REQUEST,
@@ -272,6 +293,7 @@ def update_email(request):
     # Update the user's email
     user.email = new_email
     user.save()
+    bump_data_version(user.pk)
 
     # Optionally, you can also generate a new token if needed
     Token.objects.filter(user=user).delete()
@@ -283,16 +305,17 @@ def update_email(request):
 @api_view(["GET"])
 @permission_classes([permissions.IsAuthenticated])
 def get_user_profile(request):
-    user = request.user
-    return Response(
-        {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "date_joined": user.date_joined,
-            "last_login": user.last_login,
-        }
-    )
+    return Response(profile_data(request.user))
+
+
+def profile_data(user):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "date_joined": user.date_joined,
+        "last_login": user.last_login,
+    }
 
 
 @api_view(["POST"])
@@ -318,6 +341,7 @@ def change_password(request):
     # Set new password
     user.set_password(new_password)
     user.save()
+    bump_data_version(user.pk)
 
     # Generate new token
     Token.objects.filter(user=user).delete()
@@ -326,14 +350,40 @@ def change_password(request):
     return Response({"message": "Password changed successfully", "token": token.key})
 
 
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def profiling_stats(request):
+    """Per-endpoint histograms collected by the profiling middleware"""
+    return Response(
+        {
+            "enabled": profiling.profiling_settings()["ENABLED"],
+            "endpoints": profiling.registry.snapshot(),
+        }
+    )
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def prometheus_metrics(request):
+    """Prometheus text exposition of metrics merged across all workers"""
+    return HttpResponse(
+        metrics.render_prometheus(metrics.store.collect()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 # Expense viewset
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(DataVersionETagMixin, viewsets.ModelViewSet):
     serializer_class = ExpenseSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         return Expense.objects.filter(user=self.request.user)
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
 
 # Category viewset
 class CategoryViewSet(viewsets.ModelViewSet):
@@ -344,67 +394,34 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return Category.objects.filter(user=self.request.user)
 
 
-class BudgetViewSet(viewsets.ModelViewSet):
+class BudgetViewSet(DataVersionETagMixin, viewsets.ModelViewSet):
     serializer_class = BudgetSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Budget.objects.filter(user=self.request.user)
+        return Budget.objects.filter(user=self.request.user).select_related("category")
 
     def list(self, request, *args, **kwargs):
-        """Override list method to include spending data"""
-        queryset = self.get_queryset()
-
-        # Get current month for expense calculations
-        today = timezone.now().date()
-        start_of_month = today.replace(day=1)
-
-        # Prepare enhanced budget data
-        budget_data = []
-
-        for budget in queryset:
-            # Calculate current month's spending for this category
-            current_month_spending = (
-                Expense.objects.filter(
-                    user=request.user,
-                    category=budget.category.name,
-                    date__gte=start_of_month,
-                ).aggregate(total=Sum("amount"))["total"]
-                or 0
-            )
-
-            # Calculate total spending for this category (all time)
-            total_category_spending = (
-                Expense.objects.filter(
-                    user=request.user, category=budget.category.name
-                ).aggregate(total=Sum("amount"))["total"]
-                or 0
-            )
-
-            # Calculate percentage and remaining amount
-            percentage = (
-                (current_month_spending / budget.limit) * 100 if budget.limit > 0 else 0
-            )
-            remaining = budget.limit - current_month_spending
-
-            # Create the enhanced budget object
-            budget_data.append(
-                {
-                    "id": budget.id,
-                    "category": budget.category.id,
-                    "category_name": budget.category.name,
-                    "limit": budget.limit,
-                    "spent": current_month_spending,
-                    "total_spent": total_category_spending,
-                    "percentage": round(percentage, 1),
-                    "remaining": remaining,
-                }
+        """Budgets with spending for ?period=month (default), week or custom (&start=&end=)"""
+        period = request.query_params.get("period", "month")
+        start = request.query_params.get("start")
+        end = request.query_params.get("end")
+        try:
+            start = datetime.strptime(start, "%Y-%m-%d").date() if start else None
+            end = datetime.strptime(end, "%Y-%m-%d").date() if end else None
+        except ValueError:
+            return Response(
+                {"error": "start and end must be YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            _, _, budget_data = budget_status(request.user, period, start=start, end=end)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(budget_data)
 
     def create(self, request, *args, **kwargs):
-        """Create a new budget, handling the category relationship"""
+        """Create or update the budget for a category in a single upsert"""
         category_id = request.data.get("category")
         limit = request.data.get("limit")
 
@@ -415,51 +432,74 @@ class BudgetViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            # Convert limit to float and validate
-            limit = float(limit)
-            if limit < 0:
-                return Response(
-                    {"error": "Limit must be a positive number"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            # Get the category
-            category = Category.objects.get(id=category_id, user=request.user)
-
-            # Check if budget already exists for this category
-            existing_budget = Budget.objects.filter(
-                user=request.user, category=category
-            ).first()
+            budgets, created_ids = upsert_budgets(
+                request.user, {parse_category_id(category_id): parse_limit(limit)}
+            )
+        except Category.DoesNotExist:
+            return Response(
+                {"error": "Category not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            if existing_budget:
-                # Update existing budget
-                existing_budget.limit = limit
-                existing_budget.save()
-                serializer = self.get_serializer(existing_budget)
-                return Response(serializer.data)
+        budget = budgets[0]
+        return Response(
+            self.get_serializer(budget).data,
+            status=status.HTTP_201_CREATED if budget.id in created_ids else status.HTTP_200_OK,
+        )
 
-            # Create new budget
-            budget = Budget.objects.create(
-                user=request.user, category=category, limit=limit
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Set limits for many categories at once: [{"category": id, "limit": amount}, ...]"""
+        items = request.data.get("budgets") if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"error": "Expected a non-empty list of {category, limit} objects"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > MAX_BULK_BUDGETS:
+            return Response(
+                {"error": f"At most {MAX_BULK_BUDGETS} budgets per request"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-            serializer = self.get_serializer(budget)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        limits = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get("category") or item.get("limit") is None:
+                return Response(
+                    {"error": f"Item {index}: category and limit are required"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            try:
+                # A category listed twice keeps its last limit
+                limits[parse_category_id(item["category"])] = parse_limit(item["limit"])
+            except ValueError as e:
+                return Response(
+                    {"error": f"Item {index}: {e}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
+        try:
+            budgets, created_ids = upsert_budgets(request.user, limits)
         except Category.DoesNotExist:
             return Response(
                 {"error": "Category not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        except ValueError:
-            return Response(
-                {"error": "Limit must be a valid number"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+        return Response(
+            {
+                "created": len(created_ids),
+                "updated": len(budgets) - len(created_ids),
+                "budgets": self.get_serializer(budgets, many=True).data,
+            }
+        )
 
-class FinancialGoalViewSet(viewsets.ModelViewSet):
+
+# FinancialGoal amounts are DecimalField(max_digits=10, decimal_places=2)
+MAX_GOAL_AMOUNT = Decimal("100000000")
+
+
+class FinancialGoalViewSet(DataVersionETagMixin, viewsets.ModelViewSet):
     serializer_class = FinancialGoalSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -467,105 +507,359 @@ class FinancialGoalViewSet(viewsets.ModelViewSet):
         return FinancialGoal.objects.filter(user=self.request.user)
 
     @action(detail=True, methods=["post"])
+    @idempotent
     def update_contribution(self, request, pk=None):
         """Add contribution to a financial goal"""
-        try:
-            goal = self.get_object()
-            amount = request.data.get("amount", 0)
+        # Unexpected errors must raise: @idempotent would replay a 400 forever
+        goal = self.get_object()
+        amount = request.data.get("amount", 0)
 
-            try:
-                amount = Decimal(amount)
-                if amount <= 0:
-                    return Response(
-                        {"error": "Amount must be a positive number"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-            except (InvalidOperation, TypeError):
+        try:
+            amount = Decimal(str(amount))
+            if amount <= 0:
                 return Response(
-                    {"error": "Amount must be a valid decimal number"},
+                    {"error": "Amount must be a positive number"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+        except (InvalidOperation, TypeError, ValueError):
+            return Response(
+                {"error": "Amount must be a valid decimal number"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            goal.currentAmount += amount
-            goal.save()
+        total = goal.currentAmount + amount
+        if not total.is_finite() or total >= MAX_GOAL_AMOUNT:
+            return Response(
+                {"error": f"Contributions must keep the goal below {MAX_GOAL_AMOUNT}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-            return Response(self.get_serializer(goal).data)
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        goal.currentAmount = total
+        goal.save()
+
+        return Response(self.get_serializer(goal).data)
+
+
+class NotificationViewSet(DataVersionETagMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get("unread") == "true":
+            queryset = queryset.filter(read=False)
+        return queryset
+
+    @action(detail=False, methods=["post"])
+    def mark_read(self, request):
+        """Mark the given notification ids (or all of them) as read"""
+        ids = request.data.get("ids")
+        queryset = Notification.objects.filter(user=request.user, read=False)
+        if ids is not None:
+            if not isinstance(ids, list) or not all(
+                isinstance(pk, int) and not isinstance(pk, bool) for pk in ids
+            ):
+                return Response(
+                    {"error": "ids must be a list of integers"}, status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = queryset.filter(pk__in=ids)
+        updated = queryset.update(read=True)
+        if updated:
+            bump_data_version(request.user.pk)
+        return Response({"updated": updated})
 
 
 # AI Prediction view
+def category_forecasts(user, model="linear", horizon=3, interval=0.8):
+    """Per-category monthly forecasts from the column store"""
+    columns = get_columns(user)
+
+    if not len(columns):
+        return []
+
+    # Zero-filled monthly totals for every category
+    series = columns.monthly_series()
+    monthly = series.values
+    expense_counts = np.bincount(columns.codes, minlength=len(columns.categories))
+
+    commitments = recurring.monthly_commitments(recurring.active_recurring(user))
+
+    # Need at least 3 expenses over 3 months of data for a meaningful prediction
+    eligible = (expense_counts >= 3) & ((monthly > 0).sum(axis=1) >= 3)
+    if not eligible.any():
+        return []
+
+    mean, lower, upper, models = forecasting.forecast(
+        monthly[eligible], model, horizon, interval
+    )
+    categories = [name for name, keep in zip(columns.categories, eligible) if keep]
+
+    # Known subscriptions/bills put a floor under the forecast
+    floor = np.array([commitments.get(category, 0.0) for category in categories])[:, None]
+    mean = np.maximum(mean, floor)
+    lower = np.maximum(lower, floor)
+    upper = np.maximum(upper, mean)
+
+    month_labels = [
+        key_to_date(series.last_month + i).strftime("%b %Y")
+        for i in range(1, horizon + 1)
+    ]
+
+    predictions = [
+        {
+            "category": category,
+            "model": models[row],
+            "recurring_amount": round(float(floor[row, 0]), 2),
+            "predictions": [
+                {
+                    "month": month_labels[i],
+                    "predicted_amount": round(float(mean[row, i]), 2),
+                    "lower_bound": round(float(lower[row, i]), 2),
+                    "upper_bound": round(float(upper[row, i]), 2),
+                }
+                for i in range(horizon)
+            ],
+        }
+        for row, category in enumerate(categories)
+    ]
+
+    return predictions
+
+
 @api_view(["GET"])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([PredictionsThrottle])
+@conditional_on_data_version
 def get_predictions(request):
-    # Get all expenses for the user
-    expenses = Expense.objects.filter(user=request.user)
+    model = request.query_params.get("model", "linear")
+    if model not in forecasting.MODELS:
+        return Response(
+            {"error": f"Unknown model. Choose one of: {', '.join(forecasting.MODELS)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    try:
+        horizon = int(request.query_params.get("horizon", 3))
+        interval = float(request.query_params.get("interval", 0.8))
+    except ValueError:
+        return Response(
+            {"error": "horizon and interval must be numbers"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if not 1 <= horizon <= 12 or interval not in forecasting.Z_SCORES:
+        return Response(
+            {
+                "error": "horizon must be between 1 and 12 and interval one of "
+                f"{', '.join(map(str, sorted(forecasting.Z_SCORES)))}"
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    if not expenses.exists():
-        return Response([])
+    started = perf_counter()
+    predictions = category_forecasts(request.user, model, horizon, interval)
+    metrics.observe("api_forecast_seconds", perf_counter() - started, model=model)
+    return Response(predictions)
 
-    # Get unique categories
-    categories = set(expenses.values_list("category", flat=True))
 
-    # Prepare response data
-    predictions = []
+DASHBOARD_SECTIONS = (
+    "profile",
+    "summary",
+    "budgets",
+    "goals",
+    "categories",
+    "recent",
+    "forecast",
+    "notifications",
+)
 
-    for category in categories:
-        category_expenses = expenses.filter(category=category)
 
-        # Skip if not enough data
-        if category_expenses.count() < 3:
-            continue
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([DashboardThrottle])
+@conditional_on_data_version
+def get_dashboard(request):
+    """Everything the dashboard's first paint needs in one response
+
+    ?sections=summary,budgets,... picks sections (default all); ?recent=N,
+    ?model= and ?horizon= tune the recent list and the forecast.
+    """
+    user = request.user
+    requested = request.query_params.get("sections")
+    sections = requested.split(",") if requested else list(DASHBOARD_SECTIONS)
+    unknown = [section for section in sections if section not in DASHBOARD_SECTIONS]
+    try:
+        recent_limit = int(request.query_params.get("recent", 5))
+        horizon = int(request.query_params.get("horizon", 3))
+    except ValueError:
+        return Response(
+            {"error": "recent and horizon must be numbers"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    model = request.query_params.get("model", "linear")
+    if unknown or not 1 <= recent_limit <= 50 or not 1 <= horizon <= 12 or model not in forecasting.MODELS:
+        return Response(
+            {
+                "error": f"sections must be from: {', '.join(DASHBOARD_SECTIONS)}; "
+                "recent between 1 and 50; horizon between 1 and 12; "
+                f"model one of: {', '.join(forecasting.MODELS)}"
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-        # Convert to DataFrame for easier manipulation
-        df = pd.DataFrame(list(category_expenses.values("date", "amount")))
-        df["date"] = pd.to_datetime(df["date"])
-        df["month"] = df["date"].dt.to_period("M")
+    data = {"currency": display_currency()}
+    if "profile" in sections:
+        data["profile"] = profile_data(user)
 
-        # Group by month and sum amounts
-        monthly_data = df.groupby("month")["amount"].sum().reset_index()
-        monthly_data["month_num"] = range(1, len(monthly_data) + 1)
+    if "summary" in sections:
+        columns = get_columns(user)
+        today = timezone.now().date()
+        start_of_month = today.replace(day=1)
+        start_of_last_month = (start_of_month - timedelta(days=1)).replace(day=1)
+        month_totals = columns.category_totals(start=start_of_month)
+        data["summary"] = {
+            "this_month": columns.total(start=start_of_month),
+            "last_month": columns.total(start=start_of_last_month, end=start_of_month),
+            "all_time": columns.total(),
+            "expense_count": len(columns),
+            "top_category_this_month": (
+                max(month_totals, key=month_totals.get) if month_totals else None
+            ),
+            "by_category_this_month": month_totals,
+        }
 
-        # Need at least 3 months of data for meaningful prediction
-        if len(monthly_data) < 3:
-            continue
+    if "budgets" in sections:
+        _, _, data["budgets"] = budget_status(user)
 
-        # Prepare data for regression
-        X = monthly_data[["month_num"]].values
-        y = monthly_data["amount"].values
+    if "goals" in sections:
+        goals = FinancialGoalSerializer(FinancialGoal.objects.filter(user=user), many=True).data
+        for goal in goals:
+            target = Decimal(goal["targetAmount"])
+            current = Decimal(goal["currentAmount"])
+            goal["progress"] = round(current / target * 100, 1) if target > 0 else 0
+        data["goals"] = goals
 
-        # Train linear regression model
-        model = LinearRegression()
-        model.fit(X, y)
+    if "categories" in sections:
+        data["categories"] = CategorySerializer(
+            Category.objects.filter(user=user), many=True
+        ).data
 
-        # Predict next 3 months
-        next_months = []
-        last_month = monthly_data["month"].iloc[-1]
+    if "recent" in sections:
+        data["recent"] = ExpenseSerializer(
+            Expense.objects.filter(user=user).order_by("-date", "-id")[:recent_limit], many=True
+        ).data
 
-        for i in range(1, 4):
-            next_month_num = len(monthly_data) + i
-            predicted_amount = model.predict([[next_month_num]])[0]
+    if "forecast" in sections:
+        data["forecast"] = category_forecasts(user, model, horizon)
 
-            # Ensure prediction is not negative
-            predicted_amount = max(0, predicted_amount)
+    if "notifications" in sections:
+        unread = list(Notification.objects.filter(user=user, read=False)[:20])
+        data["notifications"] = NotificationSerializer(unread, many=True).data
 
-            # Format month for display
-            next_month_date = last_month.to_timestamp() + relativedelta(months=i)
-            month_str = next_month_date.strftime("%b %Y")
+    return Response(data)
 
-            next_months.append(
-                {
-                    "month": month_str,
-                    "predicted_amount": round(float(predicted_amount), 2),
-                }
-            )
-        existing_entry = next(
-            (item for item in predictions if item["category"] == category), None
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+@conditional_on_data_version
+def sync_changes(request):
+    """Expenses, budgets and goals changed since ?since=<cursor>, plus deletions"""
+    since = request.query_params.get("since")
+    try:
+        data = sync.changes(request.user, sync.decode_cursor(since) if since else None)
+    except (ValueError, OverflowError, OSError):
+        return Response(
+            {"error": "since must be a cursor returned by a previous sync"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    except sync.CursorExpired:
+        return Response(
+            {"error": "Cursor has expired, sync again without since"},
+            status=status.HTTP_410_GONE,
         )
-        if not existing_entry:
-            predictions.append({"category": category, "predictions": next_months})
+    return Response(data)
 
-    return Response(predictions)
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+@conditional_on_data_version
+def get_expense_stats(request):
+    """Average, median, percentiles, std-dev and counts per category and month"""
+    return Response(expense_stats(request.user))
+
+
+# Bounds the trends response; longer ranges are downsampled to coarser buckets,
+# and ranges that need more yearly buckets than max_points are rejected
+MAX_TREND_POINTS = 1000
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+@conditional_on_data_version
+def get_trends(request):
+    """Bucketed spending totals per category, grouped in the database"""
+    bucket = request.query_params.get("bucket", "month")
+    if bucket not in time_series.BUCKETS:
+        return Response(
+            {"error": f"bucket must be one of: {', '.join(time_series.BUCKETS)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        end = (
+            datetime.strptime(request.query_params["end"], "%Y-%m-%d").date()
+            if "end" in request.query_params
+            else timezone.now().date()
+        )
+        # A year back by default, clamped so it cannot underflow date.min
+        start = (
+            datetime.strptime(request.query_params["start"], "%Y-%m-%d").date()
+            if "start" in request.query_params
+            else (max(end, date.min + timedelta(days=365)) - timedelta(days=365)).replace(day=1)
+        )
+        max_points = int(request.query_params.get("max_points", 366))
+    except ValueError:
+        return Response(
+            {"error": "start and end must be YYYY-MM-DD and max_points a number"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if start > end or not 1 <= max_points <= MAX_TREND_POINTS:
+        return Response(
+            {"error": f"start must not be after end and max_points must be between 1 and {MAX_TREND_POINTS}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    categories = [
+        name.strip()
+        for value in request.query_params.getlist("category")
+        for name in value.split(",")
+        if name.strip()
+    ]
+
+    # Downsample by switching to coarser buckets instead of returning too many points
+    effective_bucket = time_series.coarsest_needed(start, end, bucket, max_points)
+    if effective_bucket is None:
+        return Response(
+            {"error": f"start to end spans more than max_points ({max_points}) years"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    starts, names, values = time_series.bucketed_series(
+        request.user, effective_bucket, start, end, categories
+    )
+
+    return Response(
+        {
+            "bucket": effective_bucket,
+            "requested_bucket": bucket,
+            "currency": display_currency(),
+            "start": start,
+            "end": end,
+            "buckets": starts,
+            "totals": np.round(values.sum(axis=0), 2).tolist(),
+            "series": [
+                {"category": name, "totals": np.round(row, 2).tolist()}
+                for name, row in zip(names, values)
+            ],
+        }
+    )
 
 
 # Automated categorization
@@ -591,18 +885,16 @@ def suggest_category(description, user):
             .first()["category"]
         )
 
-    # Check for partial matches
+    # Check for partial matches, through the search index instead of icontains scans
     for word in description.split():
         if len(word) > 3:  # Only consider words with more than 3 characters
-            partial_matches = expenses.filter(description__icontains=word)
-            if partial_matches.exists():
-                # Return the most common category for this partial match
-                return (
-                    partial_matches.values("category")
-                    .annotate(count=Count("category"))
-                    .order_by("-count")
-                    .first()["category"]
+            hits = search.search_expenses(user, word, limit=25, fuzzy=False)
+            if hits:
+                # Return the most common category among the best matches
+                categories = expenses.filter(pk__in=[pk for pk, *_ in hits]).values_list(
+                    "category", flat=True
                 )
+                return Counter(categories).most_common(1)[0][0]
 
     # If no matches, return the most common category overall
     return (
@@ -613,8 +905,41 @@ def suggest_category(description, user):
     )
 
 
+@api_view(["GET"])
+@permission_classes([permissions.IsAuthenticated])
+@conditional_on_data_version
+def search_expenses(request):
+    """Ranked full-text search over expense descriptions with highlighted snippets"""
+    query = request.query_params.get("q", "").strip()
+    try:
+        limit = int(request.query_params.get("limit", 20))
+    except ValueError:
+        limit = 0
+    if not query or not 1 <= limit <= 100:
+        return Response(
+            {"error": "q is required and limit must be between 1 and 100"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    started = perf_counter()
+    hits = search.search_expenses(
+        request.user, query, limit, fuzzy=request.query_params.get("fuzzy") != "false"
+    )
+    expenses = Expense.objects.in_bulk([pk for pk, *_ in hits])
+    results = []
+    for pk, snippet, score, match in hits:
+        if pk not in expenses:
+            continue
+        row = ExpenseSerializer(expenses[pk]).data
+        row.update({"snippet": snippet, "score": round(score, 4), "match": match})
+        results.append(row)
+    metrics.observe("api_search_seconds", perf_counter() - started)
+    return Response({"query": query, "count": len(results), "results": results})
+
+
 @api_view(["POST"])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([SuggestCategoryThrottle])
 def suggest_category_api(request):
     description = request.data.get("description", "")
     if not description:
@@ -628,6 +953,7 @@ def suggest_category_api(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ExportThrottle])
 def export_csv(request):
     """Export user expenses as CSV"""
     user = request.user
@@ -638,7 +964,7 @@ def export_csv(request):
     writer = csv.writer(csv_buffer)
 
     # Add CSV header
-    writer.writerow(["Date", "Description", "Category", "Amount"])
+    writer.writerow(["Date", "Description", "Category", "Amount", "Currency"])
 
     # Add expense data
     for expense in expenses:
@@ -648,11 +974,14 @@ def export_csv(request):
                 expense.description,
                 expense.category,
                 expense.amount,
+                expense.currency,
             ]
         )
 
     # Create response with CSV content
-    response = HttpResponse(csv_buffer.getvalue(), content_type="text/csv")
+    content = csv_buffer.getvalue()
+    metrics.inc("api_export_bytes_total", len(content.encode()), format="csv")
+    response = HttpResponse(content, content_type="text/csv")
     response["Content-Disposition"] = 'attachment; filename="expenses.csv"'
 
     return response
@@ -679,6 +1008,7 @@ def detect_intent(task_classifier, candidate_labels, query):
 
 @api_view(["POST"])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([ChatbotThrottle])
 def chatbot_query(request):
     """Process natural language queries about expenses"""
     query = request.data.get("query", "").lower()
@@ -832,10 +1162,12 @@ def chatbot_query(request):
     # Greetings and general questions
 
     if query.lower() in greetings:
+        metrics.inc("api_chatbot_intents_total", intent="general_greeting")
         return Response(
             {"response": "Hello! How can I assist you with your expenses today?"}
         )
     elif query.lower() in general_questions or "help" in query.lower():
+        metrics.inc("api_chatbot_intents_total", intent="help")
         response = (
             "I'm a chatbot that can help you with queries about your expenses.\n\n"
             "I can help you with queries like:\n\n"
@@ -844,23 +1176,49 @@ def chatbot_query(request):
             "• What are my top spending categories?\n"
             "• What's my highest expense?\n"
             "• Show me my recent expenses.\n"
+            "• What are my subscriptions?\n"
             "• Predict my future expenses."
         )
         return Response({"response": response})
     if query.lower() in farewells:
+        metrics.inc("api_chatbot_intents_total", intent="farewell")
         return Response({"response": "Goodbye! Have a nice day!"})
 
-    if not expenses.exists():
+    columns = get_columns(user)
+
+    if not len(columns):
+        metrics.inc("api_chatbot_intents_total", intent="no_expenses")
         return Response({"response": "You don't have any expenses recorded yet."})
 
     # Process different types of queries
-    if "total" in query.lower() or "spent" in query.lower() or "spend" in query.lower():
+    if any(word in query.lower() for word in ("subscription", "recurring", "bills due")):
+        metrics.inc("api_chatbot_intents_total", intent="recurring_expenses")
+        upcoming = recurring.active_recurring(user)
+        if not upcoming:
+            return Response(
+                {"response": "I haven't found any recurring expenses or subscriptions yet."}
+            )
+
+        lines = [
+            f"• {item.description.title()} ({item.category}): {format_money(item.amount)} {item.frequency}, "
+            f"next around {item.next_date.strftime('%d %b %Y')}"
+            for item in upcoming
+        ]
+        monthly = sum(recurring.monthly_commitments(upcoming).values())
+        return Response(
+            {
+                "response": "Your recurring expenses:\n\n"
+                + "\n".join(lines)
+                + f"\n\nThat's about {format_money(monthly)} a month."
+            }
+        )
+    elif "total" in query.lower() or "spent" in query.lower() or "spend" in query.lower():
         # Handle queries about total spending
+        metrics.inc("api_chatbot_intents_total", intent="total_spending")
 
         # Check if query is about a specific category
-        categories = list(set(expenses.values_list("category", flat=True)))
         mentioned_category = next(
-            (cat for cat in categories if cat.lower() in query.lower()), None
+            (cat for cat in columns.categories if cat.lower() in query.lower()), None
         )
 
         # Check if query is about a specific time period
@@ -871,73 +1229,57 @@ def chatbot_query(request):
             "last month" in query.lower() or "previous month" in query.lower()
         )
 
-        if mentioned_category:
-            category_expenses = expenses.filter(category=mentioned_category)
+        today = timezone.now().date()
+        start_of_this_month = today.replace(day=1)
+        start_of_last_month = (start_of_this_month - timedelta(days=1)).replace(day=1)
 
+        if mentioned_category:
             if is_this_month:
-                today = timezone.now().date()
-                start_of_month = today.replace(day=1)
-                result = category_expenses.filter(date__gte=start_of_month).aggregate(
-                    total=Sum("amount")
-                )
+                total = columns.total(mentioned_category, start=start_of_this_month)
                 return Response(
                     {
-                        "response": f"This month, you've spent ₹{result['total'] or 0:.2f} on {mentioned_category}."
+                        "response": f"This month, you've spent {format_money(total)} on {mentioned_category}."
                     }
                 )
             elif is_last_month:
-                today = timezone.now().date()
-                start_of_this_month = today.replace(day=1)
-                last_month = start_of_this_month - timedelta(days=1)
-                start_of_last_month = last_month.replace(day=1)
-                result = category_expenses.filter(
-                    date__gte=start_of_last_month, date__lt=start_of_this_month
-                ).aggregate(total=Sum("amount"))
+                total = columns.total(
+                    mentioned_category, start=start_of_last_month, end=start_of_this_month
+                )
                 return Response(
                     {
-                        "response": f"Last month, you spent ₹{result['total'] or 0:.2f} on {mentioned_category}."
+                        "response": f"Last month, you spent {format_money(total)} on {mentioned_category}."
                     }
                 )
             else:
                 # All time for this category
-                result = category_expenses.aggregate(total=Sum("amount"))
+                total = columns.total(mentioned_category)
                 return Response(
                     {
-                        "response": f"In total, you've spent ₹{result['total'] or 0:.2f} on {mentioned_category}."
+                        "response": f"In total, you've spent {format_money(total)} on {mentioned_category}."
                     }
                 )
         else:
             # Total spending without category filter
             if is_this_month:
-                today = timezone.now().date()
-                start_of_month = today.replace(day=1)
-                result = expenses.filter(date__gte=start_of_month).aggregate(
-                    total=Sum("amount")
-                )
+                total = summary.month_total(user, start_of_this_month)
                 return Response(
                     {
-                        "response": f"This month, you've spent a total of ₹{result['total'] or 0:.2f}."
+                        "response": f"This month, you've spent a total of {format_money(total)}."
                     }
                 )
             elif is_last_month:
-                today = timezone.now().date()
-                start_of_this_month = today.replace(day=1)
-                last_month = start_of_this_month - timedelta(days=1)
-                start_of_last_month = last_month.replace(day=1)
-                result = expenses.filter(
-                    date__gte=start_of_last_month, date__lt=start_of_this_month
-                ).aggregate(total=Sum("amount"))
+                total = summary.month_total(user, start_of_last_month, end=start_of_this_month)
                 return Response(
                     {
-                        "response": f"Last month, you spent a total of ₹{result['total'] or 0:.2f}."
+                        "response": f"Last month, you spent a total of {format_money(total)}."
                     }
                 )
             else:
                 # All time total
-                result = expenses.aggregate(total=Sum("amount"))
+                total, _ = summary.lifetime(user)
                 return Response(
                     {
-                        "response": f"In total, you've spent ₹{result['total'] or 0:.2f} across all categories."
+                        "response": f"In total, you've spent {format_money(total)} across all categories."
                     }
                 )
 
@@ -945,62 +1287,43 @@ def chatbot_query(request):
         "highest" in query.lower() or "most" in query.lower() or "top" in query.lower()
     ):
         # Handle queries about highest expenses
+        metrics.inc("api_chatbot_intents_total", intent="highest_expense")
 
         # Check if it's about categories or individual expenses
         if "category" in query.lower() or "categories" in query.lower():
             # Get the category with highest total
-            category_totals = (
-                expenses.values("category")
-                .annotate(total=Sum("amount"))
-                .order_by("-total")
-            )
+            category_totals = columns.category_totals()
             if category_totals:
-                top_category = category_totals[0]
+                top_category = max(category_totals, key=category_totals.get)
                 return Response(
                     {
-                        "response": f"Your highest spending category is {top_category['category']} with a total of ₹{top_category['total']:.2f}."
+                        "response": f"Your highest spending category is {top_category} with a total of {format_money(category_totals[top_category])}."
                     }
                 )
         else:
             # Get the highest individual expense
-            highest_expense = expenses.order_by("-amount").first()
+            highest_expense = summary.highest_expense(user)
+            if not highest_expense:
+                return Response({"response": "You don't have any recorded expenses yet."})
             return Response(
                 {
-                    "response": f"Your highest expense is ₹{highest_expense.amount} for {highest_expense.description} on {highest_expense.date} in the {highest_expense.category} category."
+                    "response": f"Your highest expense is {format_money(highest_expense.amount, highest_expense.currency)} for {highest_expense.description} on {highest_expense.date} in the {highest_expense.category} category."
                 }
             )
 
-    elif "average" in query.lower() or "avg" in query.lower():
-        # Handle queries about average spending
-
-        # Check if query is about a specific category
-        categories = list(set(expenses.values_list("category", flat=True)))
-        mentioned_category = next(
-            (cat for cat in categories if cat.lower() in query.lower()), None
-        )
-
-        if mentioned_category:
-            # Average for specific category
-            category_expenses = expenses.filter(category=mentioned_category)
-            result = category_expenses.aggregate(avg=Sum("amount") / Count("id"))
-            return Response(
-                {
-                    "response": f"Your average expense in the {mentioned_category} category is ₹{result['avg'] or 0:.2f}."
-                }
-            )
-        else:
-            # Overall average
-            result = expenses.aggregate(avg=Sum("amount") / Count("id"))
-            return Response(
-                {
-                    "response": f"Your average expense amount is ₹{result['avg'] or 0:.2f}."
-                }
-            )
+    elif any(
+        word in query.lower()
+        for word in ("average", "avg", "median", "typical", "percentile")
+    ):
+        # Handle queries about average spending and the distribution around it
+        metrics.inc("api_chatbot_intents_total", intent="average_spending")
+        return handle_average_query(query.lower(), user)
 
     elif "categories" in query.lower() or "category" in query.lower():
         # List all categories with their totals
-        category_totals = (
-            expenses.values("category").annotate(total=Sum("amount")).order_by("-total")
+        metrics.inc("api_chatbot_intents_total", intent="category_spending")
+        category_totals = sorted(
+            columns.category_totals().items(), key=lambda item: item[1], reverse=True
         )
 
         if not category_totals:
@@ -1009,8 +1332,8 @@ def chatbot_query(request):
             )
 
         response = "Here are your expense categories:\n\n"
-        for idx, cat in enumerate(category_totals, 1):
-            response += f"{idx}. {cat['category']}: ₹{cat['total']:.2f}\n"
+        for idx, (category, total) in enumerate(category_totals, 1):
+            response += f"{idx}. {category}: {format_money(total)}\n"
 
         return Response({"response": response})
 
@@ -1020,12 +1343,11 @@ def chatbot_query(request):
         or "last" in query.lower()
     ):
         # Get recent expenses
+        metrics.inc("api_chatbot_intents_total", intent="recent_expenses")
         limit = 5  # Default number to show
 
         # Check if a specific number is mentioned
-        import re
-
-        num_match = re.search(r"\b(\d+)\b", query.lower())
+        num_match = NUMBER_RE.search(query.lower())
         if num_match:
             limit = int(num_match.group(1))
 
@@ -1036,7 +1358,7 @@ def chatbot_query(request):
 
         response = f"Here are your {limit} most recent expenses:\n\n"
         for idx, exp in enumerate(recent, 1):
-            response += f"{idx}. {exp.description}: ₹{exp.amount} ({exp.date}) - {exp.category}\n"
+            response += f"{idx}. {exp.description}: {format_money(exp.amount, exp.currency)} ({exp.date}) - {exp.category}\n"
 
         return Response({"response": response})
 
@@ -1046,9 +1368,9 @@ def chatbot_query(request):
         or "future" in query.lower()
     ):
         # Redirect to predictions
-        categories = list(set(expenses.values_list("category", flat=True)))
+        metrics.inc("api_chatbot_intents_total", intent="forecast_expenses")
         mentioned_category = next(
-            (cat for cat in categories if cat.lower() in query.lower()), None
+            (cat for cat in columns.categories if cat.lower() in query.lower()), None
         )
 
         if mentioned_category:
@@ -1119,6 +1441,7 @@ def chatbot_query(request):
         return "unknown"
 
     intent = detect_intent(clean_query)
+    metrics.inc("api_chatbot_intents_total", intent=intent)
 
     if intent == "total_spending":
         return handle_total_spending(user)
@@ -1129,7 +1452,9 @@ def chatbot_query(request):
     elif intent == "highest_expense":
         return handle_highest_expense(user)
     elif intent == "budgeting_goal":
-        return handle_budget_progress(user)
+        return handle_budget_progress(
+            user, period="week" if "week" in query.lower() else "month"
+        )
     elif intent == "savings_progress":
         return handle_savings_progress(user)
     elif intent == "forecast_expenses":
@@ -0,0 +1,84 @@
+"""Start-up work done once, before gunicorn forks its workers
+
+With ``preload_app`` the master imports the project and runs ``warm()``;
+forked workers then share those pages copy-on-write instead of each paying
+for imports, URL resolution, DRF settings, the FX table and numpy's first
+calls on their first request. ``freeze()`` moves everything allocated so far
+out of the garbage collector's reach, so collections in the workers don't
+touch (and un-share) those pages.
+"""
+import gc
+import logging
+from time import perf_counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def warm():
+    """Run every warm-up step, returning ``{step: seconds}``"""
+    timings = {}
+    for name, step in STEPS:
+        started = perf_counter()
+        try:
+            step()
+        except Exception:
+            # A failed warm-up only costs the first request some latency
+            logger.exception("Warm-up step %s failed", name)
+        timings[name] = perf_counter() - started
+    return timings
+
+
+def freeze():
+    gc.collect()
+    gc.freeze()
+
+
+def _urls():
+    from django.urls import get_resolver, resolve
+
+    # Imports api.views and everything it pulls in (analytics, forecasting, numpy)
+    get_resolver().url_patterns
+    resolve("/api/")
+
+
+def _rest_framework():
+    from rest_framework.settings import api_settings
+
+    # Each setting imports its classes lazily on first access
+    for name in (
+        "DEFAULT_RENDERER_CLASSES",
+        "DEFAULT_PARSER_CLASSES",
+        "DEFAULT_AUTHENTICATION_CLASSES",
+        "DEFAULT_PERMISSION_CLASSES",
+        "DEFAULT_CONTENT_NEGOTIATION_CLASS",
+        "DEFAULT_METADATA_CLASS",
+        "DEFAULT_VERSIONING_CLASS",
+        "EXCEPTION_HANDLER",
+    ):
+        getattr(api_settings, name)
+
+
+def _fx_rates():
+    from api.currency import rate_table
+
+    rate_table()
+
+
+def _numpy():
+    from api import analytics, forecasting
+
+    # First calls initialise ufunc loops and BLAS; a tiny fit runs every model
+    series = np.abs(np.sin(np.arange(2 * forecasting.SEASON * 3, dtype=np.float64))).reshape(2, -1) * 100
+    for model in forecasting.MODELS:
+        forecasting.forecast(series, model=model)
+    analytics.grouped_stats(np.array([0, 0, 1]), np.array([1.0, 2.0, 3.0]), 2)
+
+
+STEPS = [
+    ("urls", _urls),
+    ("rest_framework", _rest_framework),
+    ("fx_rates", _fx_rates),
+    ("numpy", _numpy),
+]
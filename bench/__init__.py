@@ -0,0 +1,6 @@
+"""Latency / throughput benchmarks run against the real Django views
+
+Seed data first (``python manage.py seed_expenses --users 20 --expenses 1000000``),
+then ``python -m bench.run --output bench/results/current.json`` and compare two
+runs with ``python -m bench.compare baseline.json current.json``.
+"""
@@ -0,0 +1,59 @@
+"""Compare two bench result files and fail on latency or query regressions
+
+    python -m bench.compare bench/results/baseline.json bench/results/current.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "queries", "response_bytes", "throughput_rps")
+HIGHER_IS_BETTER = {"throughput_rps"}
+
+
+def load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def compare(baseline, current, threshold):
+    """Yield (scenario, metric, old, new, change, regressed) rows"""
+    for name, new in current["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            continue
+        for metric in METRICS:
+            if metric not in old or metric not in new:
+                continue
+            before, after = old[metric], new[metric]
+            change = (after - before) / before if before else 0.0
+            if metric in HIGHER_IS_BETTER:
+                regressed = change < -threshold
+            elif metric == "queries":
+                regressed = after > before
+            else:
+                regressed = change > threshold
+            yield name, metric, before, after, change, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    regressions = 0
+    for name, metric, before, after, change, regressed in compare(
+        load(args.baseline), load(args.current), args.threshold
+    ):
+        regressions += regressed
+        flag = "REGRESSION" if regressed else ""
+        print(f"{name:<20} {metric:<15} {before:>12} -> {after:<12} {change:+8.1%} {flag}")
+
+    if regressions:
+        print(f"{regressions} regression(s) above {args.threshold:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
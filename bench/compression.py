@@ -0,0 +1,154 @@
+"""Bytes saved versus CPU spent compressing real API bodies
+
+Bodies are fetched in-process without compression, then compressed with each
+codec and level the way api/compression.py would. The report shows the
+compressed size, the CPU time per response and the bytes saved per
+millisecond of CPU, followed by a size sweep for choosing MIN_SIZE and a
+comparison of the streaming modes on the CSV export.
+
+    python -m bench.compression --user bench_0 [--repeat 20] [--chunk-size 8192]
+"""
+import argparse
+import json
+import statistics
+import time
+
+from bench.django_setup import setup_django
+from bench.scenarios import SCENARIOS, make_client, request
+
+BODIES = ["expense_list", "budget_list", "trends_month", "predictions", "export_csv"]
+LEVELS = [("gzip", 1), ("gzip", 6), ("gzip", 9), ("br", 1), ("br", 4), ("br", 6), ("br", 9)]
+SWEEP = [1, 2, 4, 8, 16, 32, 64]
+
+
+def options(encoding, level):
+    from api.compression import compression_settings
+
+    config = compression_settings()
+    config["GZIP_LEVEL" if encoding == "gzip" else "BROTLI_QUALITY"] = level
+    return config
+
+
+def timed(function, repeat):
+    """Median seconds of ``repeat`` calls, and the last result"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def fetch(client, name):
+    scenario = next(scenario for scenario in SCENARIOS if scenario.name == name)
+    response = request(client, scenario)
+    if response.streaming:
+        return response.status_code, b"".join(response.streaming_content)
+    return response.status_code, response.content
+
+
+def codec_table(bodies, encodings, repeat):
+    from api.compression import compress
+
+    print(f"{'body':14} {'codec':8} {'bytes':>10} {'saved':>7} {'cpu us':>9} {'MB/s':>7} {'KiB saved/cpu ms':>17}")
+    for name, body in bodies.items():
+        print(f"{name:14} {'identity':8} {len(body):10,}")
+        for encoding, level in LEVELS:
+            if encoding not in encodings:
+                continue
+            config = options(encoding, level)
+            seconds, compressed = timed(lambda: compress(body, encoding, config), repeat)
+            saved = len(body) - len(compressed)
+            print(
+                f"{'':14} {f'{encoding}-{level}':8} {len(compressed):10,} {saved / len(body):7.1%}"
+                f" {seconds * 1e6:9.1f} {len(body) / seconds / 1e6:7.1f} {saved / 1024 / (seconds * 1000):17.1f}"
+            )
+
+
+def size_sweep(body, encodings, repeat):
+    """Compress growing slices of the expense list to see where compression starts to pay"""
+    from api.compression import compress, compression_settings
+
+    config = compression_settings()
+    data = json.loads(body)
+    items = data["results"] if isinstance(data, dict) else data
+    print()
+    print("expense list slices, configured levels")
+    print(f"{'items':>6} {'bytes':>8}" + "".join(f" {encoding:>8} {'cpu us':>7}" for encoding in encodings))
+    for count in SWEEP:
+        if count > len(items):
+            break
+        raw = json.dumps(items[:count]).encode()
+        row = f"{count:6} {len(raw):8,}"
+        for encoding in encodings:
+            seconds, compressed = timed(lambda: compress(raw, encoding, config), repeat)
+            row += f" {len(compressed):8,} {seconds * 1e6:7.1f}"
+        print(row)
+
+
+def streaming_table(body, encodings, chunk_size, repeat):
+    """Whole body versus chunked streaming, with and without a flush per chunk"""
+    import zlib
+
+    from api.compression import compress, compress_stream, compression_settings
+
+    config = compression_settings()
+    chunks = [body[start : start + chunk_size] for start in range(0, len(body), chunk_size)]
+
+    def flushed():
+        # What Django's GZipMiddleware does: every chunk is sent straight away
+        stream = zlib.compressobj(config["GZIP_LEVEL"], zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        return b"".join([*(stream.compress(chunk) + stream.flush(zlib.Z_SYNC_FLUSH) for chunk in chunks), stream.flush()])
+
+    modes = []
+    for encoding in encodings:
+        modes.append((f"{encoding} whole body", lambda encoding=encoding: compress(body, encoding, config)))
+        modes.append(
+            (f"{encoding} streamed", lambda encoding=encoding: b"".join(compress_stream(chunks, encoding, config)))
+        )
+    modes.append(("gzip flush/chunk", flushed))
+
+    print()
+    print(f"export_csv streamed in {len(chunks)} chunks of {chunk_size:,} bytes")
+    for label, function in modes:
+        seconds, compressed = timed(function, repeat)
+        print(f"  {label:18} {len(compressed):10,} bytes {1 - len(compressed) / len(body):7.1%} saved {seconds * 1e3:8.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user", default="bench_0")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--chunk-size", type=int, default=8192)
+    parser.add_argument("--bodies", nargs="+", default=BODIES)
+    args = parser.parse_args(argv)
+
+    setup_django()
+
+    from django.contrib.auth.models import User
+
+    from api.compression import available_encodings, compression_settings
+
+    encodings = available_encodings(["gzip", "br"])
+    if "br" not in encodings:
+        print("brotli is not installed, showing gzip only")
+
+    client = make_client(User.objects.get(username=args.user))
+    bodies = {}
+    for name in args.bodies:
+        status, body = fetch(client, name)
+        if status != 200 or not body:
+            print(f"skipping {name}: status {status}")
+            continue
+        bodies[name] = body
+
+    print(f"user {args.user}, median of {args.repeat} runs, MIN_SIZE {compression_settings()['MIN_SIZE']}")
+    codec_table(bodies, encodings, args.repeat)
+    if "expense_list" in bodies:
+        size_sweep(bodies["expense_list"], encodings, args.repeat)
+    if "export_csv" in bodies:
+        streaming_table(bodies["export_csv"], encodings, args.chunk_size, max(args.repeat // 4, 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+
+def setup_django():
+    """Configure Django for in-process benchmarking against the configured DB"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "expense_tracker.settings")
+    # Benchmarks measure the endpoints themselves, not the rate limiter
+    os.environ.setdefault("THROTTLE_ENABLED", "False")
+
+    import django
+
+    django.setup()
+
+    from django.test.utils import setup_test_environment
+
+    # Allows the "testserver" host and swaps in the locmem mail backend
+    setup_test_environment()
@@ -0,0 +1,100 @@
+"""Backtest the forecasting models for accuracy and compute time
+
+Holds out the last ``--horizon`` months of every series, forecasts them from
+the rest and reports MAE, sMAPE, interval coverage and fit time per model.
+
+    python -m bench.forecast_backtest --series 500 --months 36
+    python -m bench.forecast_backtest --user bench_0
+"""
+import argparse
+import json
+from time import perf_counter
+
+import numpy as np
+
+
+def synthetic_series(count, months, seed):
+    """Monthly totals with trend, yearly seasonality, noise and late starts"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(months)
+    base = rng.lognormal(np.log(3000), 0.8, size=(count, 1))
+    trend = rng.normal(0, 0.01, size=(count, 1)) * base * t
+    amplitude = rng.uniform(0, 0.4, size=(count, 1)) * base
+    phase = rng.uniform(0, 2 * np.pi, size=(count, 1))
+    seasonal = amplitude * np.sin(2 * np.pi * t / 12 + phase)
+    noise = rng.normal(0, 0.15, size=(count, months)) * base
+    series = np.maximum(base + trend + seasonal + noise, 0)
+    # Some categories are only used from part-way through the history
+    starts = np.where(rng.random(count) < 0.3, rng.integers(0, months // 2, count), 0)
+    series[t[None, :] < starts[:, None]] = 0
+    return series
+
+
+def user_series(username):
+    from bench.django_setup import setup_django
+
+    setup_django()
+
+    from django.contrib.auth.models import User
+
+    from api.analytics import get_columns
+
+    _, monthly = get_columns(User.objects.get(username=username)).monthly_matrix()
+    return monthly
+
+
+def backtest(series, horizon, interval, repeats):
+    from api.forecasting import MODELS, forecast
+
+    train, actual = series[:, :-horizon], series[:, -horizon:]
+    results = {}
+    for model in MODELS:
+        timings = []
+        for _ in range(repeats):
+            start = perf_counter()
+            mean, lower, upper, used = forecast(train, model, horizon, interval)
+            timings.append((perf_counter() - start) * 1000)
+        error = np.abs(mean - actual)
+        denominator = np.abs(mean) + np.abs(actual)
+        smape = np.where(denominator > 0, 2 * error / np.where(denominator > 0, denominator, 1), 0)
+        covered = (actual >= lower) & (actual <= upper)
+        results[model] = {
+            "mae": round(float(error.mean()), 2),
+            "smape_pct": round(float(smape.mean() * 100), 2),
+            "interval_coverage_pct": round(float(covered.mean() * 100), 1),
+            "fit_ms": round(float(np.median(timings)), 3),
+            "fallbacks": int(sum(name != model for name in used)),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user", help="Backtest a seeded user's categories instead of synthetic data")
+    parser.add_argument("--series", type=int, default=500)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--horizon", type=int, default=3)
+    parser.add_argument("--interval", type=float, default=0.8)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write the JSON results to this path")
+    args = parser.parse_args(argv)
+
+    if args.user:
+        series = user_series(args.user)
+    else:
+        series = synthetic_series(args.series, args.months, args.seed)
+
+    results = {
+        "meta": {"series": series.shape[0], "months": series.shape[1], "horizon": args.horizon, "interval": args.interval},
+        "models": backtest(series, args.horizon, args.interval, args.repeats),
+    }
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(payload + "\n")
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Cold start and memory of the gunicorn configuration, with and without preload
+
+For each mode a fresh gunicorn is started from gunicorn.conf.py. The report
+shows the time until the first response, the latency of that first request
+and of a later one, and per-worker memory from /proc (Linux only). RSS counts
+pages shared with the master; PSS splits shared pages between the processes
+sharing them, and USS counts only the worker's private pages.
+
+    python -m bench.gunicorn_boot [--workers 2] [--token KEY --path /api/dashboard/]
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(url, token=None):
+    request = urllib.request.Request(url, headers={"Authorization": f"Token {token}"} if token else {})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    return status, time.perf_counter() - started
+
+
+def worker_pids(master):
+    with open(f"/proc/{master}/task/{master}/children") as children:
+        return [int(pid) for pid in children.read().split()]
+
+
+def memory(pid):
+    """(rss, pss, uss) in MiB"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return values["Rss"], values["Pss"], values["Private_Clean"] + values["Private_Dirty"]
+
+
+def run(preload, args):
+    port = free_port()
+    env = {
+        **os.environ,
+        "GUNICORN_PRELOAD": str(preload),
+        "WEB_CONCURRENCY": str(args.workers),
+        "GUNICORN_ACCESS_LOG": "/dev/null",
+    }
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}{args.path}"
+    try:
+        deadline = time.monotonic() + 120
+        while True:
+            try:
+                status, first = get(url, args.token)
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise SystemExit(f"gunicorn did not come up (exit code {server.poll()})")
+                time.sleep(0.02)
+        ready = time.perf_counter() - started
+
+        # Every worker serves a few requests, so lazily loaded state is counted
+        for _ in range(args.workers * args.requests):
+            _, later = get(url, args.token)
+        time.sleep(0.5)
+        workers = [memory(pid) for pid in worker_pids(server.pid)]
+        master = memory(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    return {
+        "status": status,
+        "ready": ready,
+        "first": first,
+        "later": later,
+        "master": master,
+        "workers": workers,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=10, help="Requests per worker before measuring memory")
+    parser.add_argument("--path", default="/api/")
+    parser.add_argument("--token", help="API token, for authenticated paths")
+    args = parser.parse_args(argv)
+
+    for preload in (False, True):
+        result = run(preload, args)
+        workers = result["workers"]
+        print(f"preload={preload}  ({len(workers)} workers, {args.path} -> {result['status']})")
+        print(f"  start to first response  {result['ready'] * 1000:8.0f} ms")
+        print(f"  first request            {result['first'] * 1000:8.1f} ms")
+        print(f"  later request            {result['later'] * 1000:8.1f} ms")
+        rss, pss, uss = result["master"]
+        print(f"  master   RSS {rss:6.1f} MiB  PSS {pss:6.1f} MiB  USS {uss:6.1f} MiB")
+        for rss, pss, uss in workers:
+            print(f"  worker   RSS {rss:6.1f} MiB  PSS {pss:6.1f} MiB  USS {uss:6.1f} MiB")
+        total = result["master"][1] + sum(pss for _, pss, _ in workers)
+        print(f"  total PSS {total:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Per-request cost of the full middleware stack versus the API fast path
+
+Calls both WSGI handlers in-process, interleaved, so only the middleware
+differs. The difference per request times the request rate is the CPU the
+fast path saves.
+
+    python -m bench.middleware_overhead --user bench_0 [--iterations 2000] [--rps 500]
+"""
+import argparse
+import io
+import time
+
+from bench.django_setup import setup_django
+from bench.scenarios import percentile
+
+PATHS = ["/api/", "/api/notifications/", "/api/categories/"]
+
+
+def environ(path, token, etag=None):
+    env = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "443",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": "localhost",
+        "HTTP_AUTHORIZATION": f"Token {token}",
+        "HTTP_ACCEPT": "application/json",
+        "HTTP_X_FORWARDED_PROTO": "https",
+        "wsgi.url_scheme": "https",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": io.StringIO(),
+        "wsgi.version": (1, 0),
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if etag:
+        env["HTTP_IF_NONE_MATCH"] = etag
+    return env
+
+
+def call(handler, path, token, etag=None):
+    status = []
+    started = time.perf_counter()
+    response = handler(environ(path, token, etag), lambda code, headers: status.append((code, dict(headers))))
+    body = b"".join(response)
+    response.close()
+    elapsed = time.perf_counter() - started
+    return elapsed, status[0][0], status[0][1], len(body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user", default="bench_0")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--rps", type=int, default=500, help="Request rate used to express the saving as CPU")
+    parser.add_argument("--paths", nargs="+", default=PATHS)
+    args = parser.parse_args(argv)
+
+    setup_django()
+
+    from django.core.handlers.wsgi import WSGIHandler
+    from rest_framework.authtoken.models import Token
+
+    from expense_tracker.handlers import APIFastPathHandler
+
+    token = Token.objects.get(user__username=args.user).key
+    handlers = {"full": WSGIHandler(), "fast path": APIFastPathHandler()}
+
+    print(f"{args.iterations} requests per path and handler, user {args.user}")
+    for path in args.paths:
+        for conditional in (False, True):
+            # Revalidations (304) are where middleware is the largest share
+            etag = call(handlers["full"], path, token)[2].get("ETag") if conditional else None
+            if conditional and not etag:
+                continue
+            samples = {name: [] for name in handlers}
+            sizes = {}
+            for _ in range(20):
+                for handler in handlers.values():
+                    call(handler, path, token, etag)
+            for _ in range(args.iterations):
+                for name, handler in handlers.items():
+                    elapsed, status, headers, size = call(handler, path, token, etag)
+                    samples[name].append(elapsed * 1e6)
+                    sizes[name] = (status, len(headers), size)
+
+            label = f"{path}{' (304)' if conditional else ''}"
+            print(label)
+            for name, values in samples.items():
+                status, header_count, size = sizes[name]
+                print(
+                    f"  {name:9}  p50 {percentile(values, 50):7.1f} us  p90 {percentile(values, 90):7.1f} us"
+                    f"  status {status}  {header_count} headers"
+                )
+            saved = percentile(samples["full"], 50) - percentile(samples["fast path"], 50)
+            print(
+                f"  saved      {saved:7.1f} us/request"
+                f" = {saved * args.rps / 1e6 * 100:.1f}% of a core at {args.rps} req/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
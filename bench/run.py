@@ -0,0 +1,93 @@
+"""Run the latency / throughput scenarios and record the results as JSON
+
+    python -m bench.run --user bench_0 --iterations 30 --output bench/results/current.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from bench.django_setup import setup_django
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user", default="bench_0", help="Seeded user to run the scenarios as")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent callers for throughput")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per throughput run (0 disables)")
+    parser.add_argument("--only", nargs="*", help="Scenario names to run")
+    parser.add_argument("--output", help="Write the JSON results to this path")
+    args = parser.parse_args(argv)
+
+    setup_django()
+
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    from bench.scenarios import (
+        SCENARIOS,
+        count_queries,
+        make_client,
+        measure_throughput,
+        request,
+        summarize,
+        time_calls,
+    )
+
+    user = User.objects.get(username=args.user)
+    client = make_client(user)
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "db_vendor": connection.vendor,
+            "user": user.username,
+            "expenses": user.expenses.count(),
+            "iterations": args.iterations,
+            "threads": args.threads,
+        },
+        "scenarios": {},
+    }
+
+    for scenario in SCENARIOS:
+        if args.only and scenario.name not in args.only:
+            continue
+        status, queries, size = count_queries(client, scenario)
+        samples = time_calls(lambda: request(client, scenario), args.iterations)
+        entry = {"status": status, "queries": queries, "response_bytes": size, **summarize(samples)}
+        if args.duration > 0:
+            entry["throughput_rps"] = measure_throughput(
+                lambda: (lambda c=make_client(user): request(c, scenario)),
+                args.threads,
+                args.duration,
+            )
+        results["scenarios"][scenario.name] = entry
+        print(
+            f"{scenario.name:<20} p50 {entry['p50_ms']:>9.2f} ms  p95 {entry['p95_ms']:>9.2f} ms  "
+            f"{queries:>4} queries  {size:>10} B  {entry.get('throughput_rps', '-')} rps",
+            file=sys.stderr,
+        )
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as fh:
+            fh.write(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
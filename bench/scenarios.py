@@ -0,0 +1,107 @@
+"""Scenario definitions and the timing loop shared by the bench scripts"""
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from time import perf_counter
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: str
+    method: str = "get"
+    data: dict = field(default_factory=dict)
+
+
+SCENARIOS = [
+    Scenario("expense_list", "/api/expenses/"),
+    Scenario("budget_list", "/api/budgets/"),
+    Scenario("predictions", "/api/predictions/"),
+    Scenario("predictions_holt_winters", "/api/predictions/?model=holt_winters"),
+    Scenario("trends_month", "/api/trends/?bucket=month"),
+    Scenario("trends_day_downsampled", "/api/trends/?bucket=day&start=2020-01-01&max_points=200"),
+    Scenario("suggest_category", "/api/suggest-category/", "post", {"description": "uber ride to office"}),
+    Scenario("chatbot_total", "/api/chatbot/", "post", {"query": "how much did I spend this month"}),
+    Scenario("chatbot_average", "/api/chatbot/", "post", {"query": "average food expense"}),
+    Scenario("chatbot_budget", "/api/chatbot/", "post", {"query": "budget limit status"}),
+    Scenario("export_csv", "/api/export/csv/"),
+]
+
+
+def make_client(user):
+    from django.test import Client
+    from rest_framework.authtoken.models import Token
+
+    token, _ = Token.objects.get_or_create(user=user)
+    return Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+
+def request(client, scenario, **extra):
+    call = getattr(client, scenario.method)
+    if scenario.method == "get":
+        return call(scenario.path, secure=True, **extra)
+    return call(scenario.path, scenario.data, content_type="application/json", secure=True, **extra)
+
+
+def response_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def count_queries(client, scenario):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = request(client, scenario)
+        size = response_size(response)
+    return response.status_code, len(ctx.captured_queries), size
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def summarize(samples_ms):
+    return {
+        "mean_ms": round(statistics.fmean(samples_ms), 3),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "min_ms": round(min(samples_ms), 3),
+    }
+
+
+def time_calls(fn, iterations, warmup=2):
+    """Run ``fn`` sequentially and return per-call latencies in ms"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = perf_counter()
+        fn()
+        samples.append((perf_counter() - start) * 1000)
+    return samples
+
+
+def measure_throughput(make_call, threads, duration):
+    """Requests per second with ``threads`` concurrent callers for ``duration`` seconds"""
+    from django.db import connections
+
+    def worker():
+        call = make_call()
+        done = 0
+        deadline = perf_counter() + duration
+        while perf_counter() < deadline:
+            call()
+            done += 1
+        connections.close_all()
+        return done
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        total = sum(pool.map(lambda _: worker(), range(threads)))
+    return round(total / (perf_counter() - start), 2)
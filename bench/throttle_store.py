@@ -0,0 +1,83 @@
+"""Contention benchmark for the shared token-bucket store behind the API throttles
+
+Several processes hammer the same buckets for a fixed time. The report shows
+per-take latency and checks that the processes together were never allowed
+more than one bucket's worth: capacity + refill rate x duration.
+
+    python -m bench.throttle_store [--processes 4] [--duration 3] [--keys 1]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from bench.django_setup import setup_django
+from bench.scenarios import percentile
+
+CAPACITY = 60
+REFILL_PER_SECOND = 0.5
+
+
+def worker(path, keys, duration, ready, results):
+    setup_django()
+
+    from api.throttling import BucketStore
+
+    store = BucketStore(path)
+    # Open the connection (and create the table) outside the timed loop
+    store.take("warmup", 0, CAPACITY, REFILL_PER_SECOND)
+    ready.wait()
+    latencies, allowed, index = [], 0, 0
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        key = f"user:{index % keys}"
+        index += 1
+        started = time.perf_counter()
+        wait = store.take(key, 1, CAPACITY, REFILL_PER_SECOND)
+        latencies.append((time.perf_counter() - started) * 1000)
+        allowed += not wait
+    results.put((allowed, latencies))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--keys", type=int, default=1, help="Distinct buckets (users) to spread takes over")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "throttle.sqlite3")
+        results = multiprocessing.Queue()
+        ready = multiprocessing.Barrier(args.processes)
+        processes = [
+            multiprocessing.Process(target=worker, args=(path, args.keys, args.duration, ready, results))
+            for _ in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        # A worker that died never reports; fail instead of waiting forever
+        outcomes = [results.get(timeout=args.duration + 60) for _ in processes]
+        for process in processes:
+            process.join()
+
+    allowed = sum(count for count, _ in outcomes)
+    latencies = sorted(latency for _, samples in outcomes for latency in samples)
+    ceiling = args.keys * (CAPACITY + REFILL_PER_SECOND * args.duration)
+    print(f"{args.processes} processes, {args.keys} bucket(s), {args.duration:.1f}s")
+    print(f"  takes      {len(latencies)} ({len(latencies) / args.duration:,.0f}/s)")
+    print(
+        f"  latency    p50 {percentile(latencies, 50):.3f} ms  p99 {percentile(latencies, 99):.3f} ms"
+        f"  max {latencies[-1]:.3f} ms"
+    )
+    print(f"  allowed    {allowed} (ceiling {ceiling:.0f})")
+    if allowed > ceiling + args.keys:
+        print("FAIL  more tokens were spent than the buckets hold")
+        return 1
+    print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,6 +6,7 @@ from pathlib import Path
 import os
 from urllib.parse import urlparse
 import dj_database_url
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -52,6 +53,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    "api.metrics.MetricsMiddleware",
+    "api.compression.CompressionMiddleware",
+    "api.profiling.ProfilingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -61,6 +65,19 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# /api/ is token-authenticated: it skips WhiteNoise, sessions, CSRF, auth,
+# messages and X-Frame-Options (expense_tracker/handlers.py). Admin keeps MIDDLEWARE.
+API_FASTPATH = os.environ.get('API_FASTPATH', 'True') == 'True'
+API_FASTPATH_PREFIX = "/api/"
+API_MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "api.metrics.MetricsMiddleware",
+    "api.compression.CompressionMiddleware",
+    "api.profiling.ProfilingMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
 ROOT_URLCONF = "expense_tracker.urls"
 
 TEMPLATES = [
@@ -141,13 +158,126 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # REST Framework settings
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.InstrumentedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
 }
 
+# Sampled request profiling (Server-Timing headers + /api/profiling/)
+API_PROFILING = {
+    "ENABLED": os.environ.get('API_PROFILING', 'False') == 'True',
+    "SAMPLE_RATE": float(os.environ.get('API_PROFILING_SAMPLE_RATE', '0.05')),
+    "SERVER_TIMING": True,
+}
+
+# Prometheus metrics (/api/metrics), merged across gunicorn workers through DIR
+METRICS = {
+    "ENABLED": os.environ.get('METRICS_ENABLED', 'True') == 'True',
+    "DIR": os.environ.get('METRICS_DIR', os.path.join(BASE_DIR, '.metrics')),
+    "FLUSH_INTERVAL": 1.0,
+}
+
+# Per-process LRU of per-user expense columns used by analytics endpoints
+ANALYTICS_CACHE_MAX_BYTES = int(os.environ.get('ANALYTICS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# Cache backend: locmem (per process), file (shared on one host) or redis (any
+# Redis-protocol server, e.g. a local redis/valkey/keydb at REDIS_URL)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, '.cache')),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Chatbot handler responses cached per user + data version (api/caching.py)
+HANDLER_CACHE = {
+    "ENABLED": os.environ.get('HANDLER_CACHE_ENABLED', 'True') == 'True',
+    "ALIAS": "default",
+    "TIMEOUT": 60 * 60,
+    "LOCK_TIMEOUT": 10,
+    "LOCK_WAIT": 2.0,
+}
+
+# /api/sync/ delta cursors; older cursors must resync from scratch
+SYNC = {
+    "TOMBSTONE_RETENTION_DAYS": 90,
+    "CURSOR_OVERLAP_SECONDS": 2,
+}
+
+# Retried POSTs carrying the same Idempotency-Key replay the first response (api/idempotency.py)
+IDEMPOTENCY = {
+    "TTL_SECONDS": 24 * 60 * 60,
+    # A claim whose request never finished is taken over by retries after this;
+    # keep it above the gunicorn worker timeout
+    "LEASE_SECONDS": 60,
+    "MAX_KEY_LENGTH": 255,
+}
+
+# Response compression (api/compression.py): brotli when installed, else gzip.
+# HTML stays uncompressed (BREACH); static files are precompressed by WhiteNoise.
+COMPRESSION = {
+    "ENABLED": os.environ.get('COMPRESSION_ENABLED', 'True') == 'True',
+    "MIN_SIZE": int(os.environ.get('COMPRESSION_MIN_SIZE', '1024')),
+    "CONTENT_TYPES": ["application/json", "text/csv", "text/plain"],
+    "ENCODINGS": ["br", "gzip"],
+    "GZIP_LEVEL": 6,
+    "BROTLI_QUALITY": 4,
+}
+
+# Token buckets for the expensive endpoints (api/throttling.py); one bucket per
+# user, shared by all workers through a SQLite file
+THROTTLE = {
+    "ENABLED": os.environ.get('THROTTLE_ENABLED', 'True') == 'True',
+    "STORE": os.environ.get('THROTTLE_STORE', os.path.join(BASE_DIR, '.cache', 'throttle.sqlite3')),
+    "CAPACITY": 60,
+    "REFILL_PER_MINUTE": 30,
+    # Charged instead of the full cost when If-None-Match already matches
+    "REVALIDATE_COST": 1,
+    "COSTS": {
+        "predictions": 10,
+        "dashboard": 6,
+        "export": 15,
+        "chatbot": 3,
+        "suggest_category": 1,
+    },
+}
+
+# Expenses may be recorded in any currency in RATES_FILE; aggregates are shown in DISPLAY
+CURRENCY = {
+    "DISPLAY": os.environ.get('DISPLAY_CURRENCY', 'INR'),
+    "RATES_FILE": os.environ.get('FX_RATES_FILE', os.path.join(BASE_DIR, 'api', 'data', 'fx_rates.json')),
+    # How stale the rates may be after the file is replaced
+    "RELOAD_CHECK_SECONDS": 5,
+}
+
+# Budget/anomaly alerts computed by `manage.py process_alerts` off the request path
+ALERTS = {
+    "BUDGET_THRESHOLDS": (0.8, 1.0),
+    "ANOMALY_Z_SCORE": 3.0,
+    "ANOMALY_MIN_HISTORY": 10,
+    "BATCH_SIZE": 1000,
+    "EMAIL": os.environ.get('ALERT_EMAILS', 'True') == 'True',
+}
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
@@ -173,6 +303,8 @@ CSRF_TRUSTED_ORIGINS = [
     "https://expense-tracker-fe-six.vercel.app/"
 ]
 
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+
 CORS_ALLOW_CREDENTIALS = True
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
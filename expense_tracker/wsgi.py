@@ -4,8 +4,8 @@ WSGI config for expense_tracker project.
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+from expense_tracker.handlers import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'expense_tracker.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
@@ -0,0 +1,62 @@
+"""Gunicorn settings, read automatically from the working directory
+
+The app is preloaded and warmed in the master (api/warmup.py), so workers
+fork with Django, numpy and the URLconf already imported and share those
+pages copy-on-write. Workers are recycled after a jittered number of requests
+so slow leaks never build up and they don't all restart at once. Everything is
+overridable from the environment, e.g. on Railway:
+
+    WEB_CONCURRENCY=3 GUNICORN_THREADS=4 GUNICORN_MAX_REQUESTS=2000
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+wsgi_app = "expense_tracker.wsgi:application"
+
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+# Threads need gthread; an explicit class (e.g. "sync" for CPU-bound hosts) wins
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread" if threads > 1 else "sync")
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "True") == "True"
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", str(max_requests // 10)))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def _warm(log, freeze=False):
+    from api import warmup
+
+    timings = warmup.warm()
+    log.info(
+        "Warm-up done in %.0f ms (%s)",
+        sum(timings.values()) * 1000,
+        ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()),
+    )
+    if freeze:
+        warmup.freeze()
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        _warm(server.log, freeze=True)
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        from django.db import connections
+
+        # Connections opened in the master must not be shared by the workers
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        _warm(worker.log)